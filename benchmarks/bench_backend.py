@@ -0,0 +1,30 @@
+"""
+Compare the big integer backends of the curve arithmetic. Run from the
+repository root:
+
+    python -m benchmarks.bench_backend
+"""
+from bitcoin import backend, ecc
+from bitcoin.ecc import G, PrivateKey
+
+from .bench_ecc import bench
+
+
+def main():
+    ecc.signature_cache = None
+    point = 0x12345deadbeef * G
+    k = 0x7c076ff316692a3d7eb3c3bb0f8b1488cf72e1afcd929e29307032997a838a3d
+    private_key = PrivateKey(0x12345deadbeef)
+    signature = private_key.sign(k)
+    for name in backend.available():
+        backend.use(name)
+        k * G  # build the generator table outside the timings
+        bench(f'[{name}] k * P', lambda: k * point, 50)
+        bench(f'[{name}] k * G', lambda: k * G, 200)
+        bench(f'[{name}] PrivateKey.sign', lambda: private_key.sign(k), 200)
+        bench(f'[{name}] S256Point.verify',
+              lambda: private_key.point.verify(k, signature), 50)
+
+
+if __name__ == '__main__':
+    main()
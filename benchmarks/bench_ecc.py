@@ -0,0 +1,64 @@
+"""
+Rough timings for the elliptic curve code. Run from the repository root:
+
+    python -m benchmarks.bench_ecc
+"""
+import timeit
+
+from bitcoin import ecc
+from bitcoin.ecc import (
+    G, FieldElement, Point, PrivateKey, S256Point, addresses_for_secrets
+)
+
+
+def bench(label, func, number):
+    seconds = timeit.timeit(func, number=number) / number
+    print(f'{label:<40} {seconds * 1e6:>12.1f} us')
+    return seconds
+
+
+def bench_scalar_methods():
+    point = 0x12345deadbeef * G
+    k = 0x7c076ff316692a3d7eb3c3bb0f8b1488cf72e1afcd929e29307032997a838a3d
+    bench('S256Point affine double-and-add', lambda: point._multiply_binary(k), 5)
+    for method in ('binary', 'wnaf'):
+        S256Point.SCALAR_METHOD = method
+        bench(f'S256Point k * P ({method})', lambda: k * point, 50)
+    S256Point.SCALAR_METHOD = 'wnaf'
+    bench('S256Point k * G (fixed-base table)', lambda: k * G, 200)
+
+    prime = 223
+    a, b = FieldElement(0, prime), FieldElement(7, prime)
+    small = Point(FieldElement(47, prime), FieldElement(71, prime), a, b)
+    for method in ('binary', 'wnaf'):
+        Point.SCALAR_METHOD = method
+        bench(f'Point over F_223 k * P ({method})', lambda: 20 * small, 2000)
+    Point.SCALAR_METHOD = 'binary'
+
+
+def bench_signatures():
+    private_key = PrivateKey(0x12345deadbeef)
+    z = 0xec208baa0fc1c19f708a9ca96fdeff3ac3f230bb4a7ba4aede4942ad003c0f60
+    signature = private_key.sign(z)
+    bench('PrivateKey.sign', lambda: private_key.sign(z), 200)
+    # Without the signature cache every call after the first is a lookup.
+    cache, ecc.signature_cache = ecc.signature_cache, None
+    try:
+        bench('S256Point.verify',
+              lambda: private_key.point.verify(z, signature), 50)
+    finally:
+        ecc.signature_cache = cache
+
+
+def bench_addresses():
+    secrets = list(range(10**6, 10**6 + 1000))
+    bench('1000 addresses, one at a time',
+          lambda: [PrivateKey(e).point.address() for e in secrets], 1)
+    bench('1000 addresses, addresses_for_secrets',
+          lambda: addresses_for_secrets(secrets), 1)
+
+
+if __name__ == '__main__':
+    bench_scalar_methods()
+    bench_signatures()
+    bench_addresses()
@@ -0,0 +1,27 @@
+"""
+Compare the RIPEMD-160 backends. Run from the repository root:
+
+    python -m benchmarks.bench_hashes
+"""
+from bitcoin import hashes
+from bitcoin.helpers import hash160
+
+from .bench_ecc import bench
+
+
+def main():
+    sec = bytes.fromhex(
+        '0330d54fd0dd420a6e5f8d3624f5f3482cae350f79d5f0753bf5beef9c2d91af3c')
+    block = bytes(1024)
+    previous = hashes.NAME
+    for name in hashes.available():
+        hashes.use(name)
+        bench(f'[{name}] hash160 of a public key', lambda: hash160(sec), 10000)
+        seconds = bench(f'[{name}] ripemd160 of 1 KiB',
+                        lambda: hashes.ripemd160(block), 1000)
+        print(f'{"":<40} {len(block) / seconds / 2**20:>9.1f} MiB/s')
+    hashes.use(previous)
+
+
+if __name__ == '__main__':
+    main()
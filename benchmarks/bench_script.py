@@ -0,0 +1,100 @@
+"""
+Compare the script number codec with the byte-by-byte loops it replaced,
+on its own and over the opcode tests in tests/test_op.py. Run from the
+repository root:
+
+    python -m benchmarks.bench_script
+"""
+import inspect
+
+from bitcoin import op
+from bitcoin.helpers import cast_to_bool, decode_num, encode_num
+from tests import test_op
+
+from .bench_ecc import bench
+
+
+def loop_encode_num(num):
+    if num == 0:
+        return b''
+    abs_num = abs(num)
+    negative = num < 0
+    result = bytearray()
+    while abs_num:
+        result.append(abs_num & 0xff)
+        abs_num >>= 8
+    if result[-1] & 0x80:
+        if negative:
+            result.append(0x80)
+        else:
+            result.append(0)
+    elif negative:
+        result[-1] = result[-1] | 0x80
+    return bytes(result)
+
+
+def loop_decode_num(element):
+    if element == b'':
+        return 0
+    big_endian = element[::-1]
+    if big_endian[0] & 0x80:
+        negative = True
+        result = big_endian[0] & 0x7f
+    else:
+        negative = False
+        result = big_endian[0]
+    for c in big_endian[1:]:
+        result <<= 8
+        result += c
+    if negative:
+        return -result
+    else:
+        return result
+
+
+def opcode_tests():
+    """
+    The opcode tests that take no fixtures, leaving out the signature
+    checks whose curve math would hide the codec.
+    """
+    tests = []
+    for name, func in inspect.getmembers(test_op, inspect.isfunction):
+        if (name.startswith('test_') and 'checksig' not in name
+                and not inspect.signature(func).parameters):
+            tests.append(func)
+    return tests
+
+
+def run_all(tests):
+    for test in tests:
+        test()
+
+
+def main():
+    numbers = list(range(-1, 17)) + [100, -1000, 2**31 - 1, -2**31 + 1]
+    elements = [encode_num(n) for n in numbers] + [b'\x00\x00\x80']
+    for label, encode, decode, truthy in (
+            ('loop', loop_encode_num, loop_decode_num,
+             lambda e: loop_decode_num(e) != 0),
+            ('table', encode_num, decode_num, cast_to_bool)):
+        bench(f'[{label}] encode_num x{len(numbers)}',
+              lambda: [encode(n) for n in numbers], 10000)
+        bench(f'[{label}] decode_num x{len(elements)}',
+              lambda: [decode(e) for e in elements], 10000)
+        bench(f'[{label}] truthiness x{len(elements)}',
+              lambda: [truthy(e) for e in elements], 10000)
+
+    tests = opcode_tests()
+    run_all(tests)  # warm up caches outside the timings
+    originals = op.encode_num, op.decode_num, op.cast_to_bool
+    op.encode_num, op.decode_num = loop_encode_num, loop_decode_num
+    op.cast_to_bool = lambda e: loop_decode_num(e) != 0
+    try:
+        bench(f'[loop] {len(tests)} opcode tests', lambda: run_all(tests), 200)
+    finally:
+        op.encode_num, op.decode_num, op.cast_to_bool = originals
+    bench(f'[table] {len(tests)} opcode tests', lambda: run_all(tests), 200)
+
+
+if __name__ == '__main__':
+    main()
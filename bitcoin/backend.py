@@ -0,0 +1,79 @@
+"""
+Big integer backend for the curve arithmetic in ecc.py.
+
+The Jacobian point arithmetic runs on `mpz` numbers and the modular
+exponentiations go through `powmod` and `invert`. With gmpy2 installed
+these are GMP numbers, otherwise plain Python ints. Values handed back to
+the rest of the library are always Python ints, so both backends give
+identical results. `invert` raises ZeroDivisionError on both backends when
+there is no inverse.
+"""
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+
+NAME = 'python'
+mpz = int
+
+_hooks = []
+
+
+def _python_powmod(a, exponent, modulus):
+    return pow(a, exponent, modulus)
+
+
+def _python_invert(a, modulus):
+    try:
+        return pow(a, -1, modulus)
+    except ValueError:
+        # Raise what gmpy2.invert raises, so callers see one type.
+        raise ZeroDivisionError(f'{a} is not invertible modulo {modulus}.')
+
+
+def _gmpy2_powmod(a, exponent, modulus):
+    return int(gmpy2.powmod(a, exponent, modulus))
+
+
+def _gmpy2_invert(a, modulus):
+    return int(gmpy2.invert(a, modulus))
+
+
+powmod = _python_powmod
+invert = _python_invert
+
+
+def available():
+    """
+    Returns the names of the backends that can be used here.
+    """
+    if gmpy2 is None:
+        return ['python']
+    return ['python', 'gmpy2']
+
+
+def use(name):
+    """
+    Switch to the 'python' or 'gmpy2' backend.
+    """
+    global NAME, mpz, powmod, invert
+    if name not in available():
+        raise ValueError(f'Backend {name} is not available.')
+    NAME = name
+    if name == 'gmpy2':
+        mpz, powmod, invert = gmpy2.mpz, _gmpy2_powmod, _gmpy2_invert
+    else:
+        mpz, powmod, invert = int, _python_powmod, _python_invert
+    for hook in _hooks:
+        hook()
+
+
+def on_change(hook):
+    """
+    Register a function called after every backend switch.
+    """
+    _hooks.append(hook)
+
+
+use('gmpy2' if gmpy2 is not None else 'python')
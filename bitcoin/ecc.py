@@ -1,10 +1,17 @@
-from io import BytesIO
+import hashlib
+import mmap
+import os
+import queue
+import secrets
+import struct
+import threading
 from random import randint 
 
+from . import backend
 from .exceptions import BadSignature
 from .helpers import (
-    encode_base58_checksum, hash160, hash256,
-    little_endian_to_int,
+    LRUCache, encode_base58_checksum, encode_segwit_address, hash160,
+    hash256, little_endian_to_int, tagged_hash,
 )
 
 
@@ -20,6 +27,8 @@ class FieldElement(object):
         The size of the finite field.
     """
 
+    __slots__ = ('val', 'prime')
+
     def __init__(self, val, prime):
         if val >= prime or val < 0:
             raise ValueError(f'Num {val} not in field range 0 to {prime}')
@@ -85,6 +94,8 @@ class Point(object):
         The parameters for the elliptic curve y^2 = x^3 + ax + b
     """
 
+    __slots__ = ('x', 'y', 'a', 'b')
+
     @property
     def curve(self):
         return (self.a, self.b)
@@ -151,7 +162,26 @@ class Point(object):
             y = s * (self.x - x) - self.y
             return self.__class__(x, y, self.a, self.b)
 
+    def __neg__(self):
+        if self.is_identity:
+            return self
+        if isinstance(self.y, FieldElement):
+            y = self.y.__class__(-self.y.val % self.y.prime, self.y.prime)
+        else:
+            y = -self.y
+        return self.__class__(self.x, y, self.a, self.b)
+
+    # Scalar multiplication algorithm used by `coefficient * point`, either
+    # 'binary' (double-and-add) or 'wnaf' (width-w non-adjacent form).
+    SCALAR_METHOD = 'binary'
+    WNAF_WIDTH = 4
+
     def __rmul__(self, coefficient):
+        if self.SCALAR_METHOD == 'wnaf':
+            return self._multiply_wnaf(coefficient, self.WNAF_WIDTH)
+        return self._multiply_binary(coefficient)
+
+    def _multiply_binary(self, coefficient):
         coef = coefficient
         current = self
         result = self.__class__(None, None, self.a, self.b)
@@ -162,33 +192,449 @@ class Point(object):
             coef >>= 1
         return result
 
+    def _multiply_wnaf(self, coefficient, width):
+        # odd[i] holds (2i + 1) * self
+        odd = [self]
+        double = self + self
+        for _ in range(2**(width - 2) - 1):
+            odd.append(odd[-1] + double)
+        result = self.__class__(None, None, self.a, self.b)
+        for digit in reversed(wnaf(coefficient, width)):
+            result += result
+            if digit > 0:
+                result += odd[digit >> 1]
+            elif digit < 0:
+                result += -odd[-digit >> 1]
+        return result
+
+
+def wnaf(k, width):
+    """
+    Returns the width-w non-adjacent form of a non-negative integer, least
+    significant digit first. Every non-zero digit is odd, lies between
+    -2^(width-1) and 2^(width-1), and is followed by at least width-1 zeros.
+    """
+    digits = []
+    window = 2**width
+    while k:
+        if k & 1:
+            digit = k % window
+            if digit >= window >> 1:
+                digit -= window
+            k -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        k >>= 1
+    return digits
+
+
+P = 2**256 - 2**32 - 977
+
 
 class S256Field(FieldElement):
-    P = 2**256 - 2**32 - 977
+    P = P
+
+    __slots__ = ()
 
     def __init__(self, val, *args, **kwargs):
         super().__init__(val, self.P)
 
+    @classmethod
+    def _new(cls, val):
+        """
+        Build an element from a value already reduced modulo P, skipping the
+        range check of the public constructor.
+        """
+        element = object.__new__(cls)
+        element.val = val
+        element.prime = P
+        return element
+
     def __str__(self):
         return '{:x}'.format(self.val).zfill(64)
 
+    # The arithmetic below skips the prime checks and range checks of
+    # FieldElement when both operands are S256Field elements.
+
+    def __add__(self, other):
+        if other.__class__ is not S256Field:
+            return super().__add__(other)
+        return S256Field._new((self.val + other.val) % P)
+
+    def __sub__(self, other):
+        if other.__class__ is not S256Field:
+            return super().__sub__(other)
+        return S256Field._new((self.val - other.val) % P)
+
+    def __mul__(self, other):
+        if other.__class__ is not S256Field:
+            return super().__mul__(other)
+        return S256Field._new(self.val * other.val % P)
+
+    def __rmul__(self, other):
+        if type(other) == int:
+            return S256Field._new(other * self.val % P)
+        return super().__rmul__(other)
+
+    def __pow__(self, exponent):
+        return S256Field._new(backend.powmod(self.val, exponent % (P - 1), P))
+
+    def __truediv__(self, other):
+        if other.__class__ is not S256Field:
+            return super().__truediv__(other)
+        if not other.val:
+            return S256Field._new(0)
+        return S256Field._new(self.val * backend.invert(other.val, P) % P)
+
     def sqrt(self):
         return self**((self.P + 1) // 4)
 
+    @classmethod
+    def batch_inverse(cls, elements):
+        """
+        Returns the inverses of many field elements using a single field
+        inversion (Montgomery's trick). Zero is left as zero, in line with
+        division by zero in FieldElement.
+        """
+        return [cls._new(int(v))
+                for v in _batch_invert([e.val for e in elements])]
+
 
 A = 0
 B = 7
 N = 0xfffffffffffffffffffffffffffffffebaaedce6af48a03bbfd25e8cd0364141
 
 
+# JACOBIAN COORDINATES
+# ----------------------------------------------------------------------------
+# Internally a point is kept as a tuple of ints (X, Y, Z) representing the
+# affine point (X/Z^2, Y/Z^3). Additions and doublings then need no field
+# inversion at all; we only pay for a single inversion when converting the
+# final result back to affine coordinates.
+
+_INFINITY = (0, 1, 0)
+
+# The field prime as a number of the current big integer backend.
+_P = P
+
+
+def _sync_backend():
+    global _P, _GENERATOR_TABLE
+    _P = backend.mpz(P)
+    # Rebuild the generator table with numbers of the new backend. A table
+    # mapped from a file converts its entries on every read, so it stays.
+    if not isinstance(_GENERATOR_TABLE, _MappedTable):
+        _GENERATOR_TABLE = None
+
+
+def _jacobian_double(p1):
+    x1, y1, z1 = p1
+    if not z1 or not y1:
+        return _INFINITY
+    a = x1 * x1 % _P
+    b = y1 * y1 % _P
+    c = b * b % _P
+    d = 2 * ((x1 + b) * (x1 + b) - a - c) % _P
+    e = 3 * a % _P
+    x3 = (e * e - 2 * d) % _P
+    y3 = (e * (d - x3) - 8 * c) % _P
+    z3 = 2 * y1 * z1 % _P
+    return (x3, y3, z3)
+
+
+def _jacobian_add(p1, p2):
+    x1, y1, z1 = p1
+    x2, y2, z2 = p2
+    if not z1:
+        return p2
+    if not z2:
+        return p1
+    z1z1 = z1 * z1 % _P
+    z2z2 = z2 * z2 % _P
+    u1 = x1 * z2z2 % _P
+    u2 = x2 * z1z1 % _P
+    s1 = y1 * z2 * z2z2 % _P
+    s2 = y2 * z1 * z1z1 % _P
+    h = (u2 - u1) % _P
+    r = (s2 - s1) % _P
+    if not h:
+        if not r:
+            return _jacobian_double(p1)
+        return _INFINITY
+    hh = h * h % _P
+    hhh = h * hh % _P
+    v = u1 * hh % _P
+    x3 = (r * r - hhh - 2 * v) % _P
+    y3 = (r * (v - x3) - s1 * hhh) % _P
+    z3 = h * z1 * z2 % _P
+    return (x3, y3, z3)
+
+
+def _jacobian_add_affine(p1, x2, y2):
+    """
+    Add an affine point (x2, y2) to a Jacobian point, which saves a few
+    multiplications compared to a full Jacobian addition.
+    """
+    x1, y1, z1 = p1
+    if not z1:
+        return (x2, y2, 1)
+    z1z1 = z1 * z1 % _P
+    u2 = x2 * z1z1 % _P
+    s2 = y2 * z1 * z1z1 % _P
+    h = (u2 - x1) % _P
+    r = (s2 - y1) % _P
+    if not h:
+        if not r:
+            return _jacobian_double(p1)
+        return _INFINITY
+    hh = h * h % _P
+    hhh = h * hh % _P
+    v = x1 * hh % _P
+    x3 = (r * r - hhh - 2 * v) % _P
+    y3 = (r * (v - x3) - y1 * hhh) % _P
+    z3 = h * z1 % _P
+    return (x3, y3, z3)
+
+
+def _jacobian_negate(p1):
+    x1, y1, z1 = p1
+    return (x1, -y1 % _P, z1)
+
+
+def _jacobian_multi_multiply(terms, width=None):
+    """
+    Computes the sum of coefficient * point over a list of
+    (coefficient, jacobian_point) terms. The terms are walked digit by digit
+    together (Strauss' trick) so all of them share the same doublings.
+
+    With a `width` every coefficient is recoded to wNAF and the odd
+    multiples of its point are precomputed, otherwise plain binary digits
+    are used.
+    """
+    if width is None:
+        expanded = []
+        for k, p1 in terms:
+            digits = []
+            while k:
+                digits.append(k & 1)
+                k >>= 1
+            expanded.append((digits, [p1]))
+    else:
+        expanded = []
+        for k, p1 in terms:
+            odd = [p1]
+            double = _jacobian_double(p1)
+            for _ in range(2**(width - 2) - 1):
+                odd.append(_jacobian_add(odd[-1], double))
+            expanded.append((wnaf(k, width), odd))
+
+    result = _INFINITY
+    length = max((len(digits) for digits, _ in expanded), default=0)
+    for i in range(length - 1, -1, -1):
+        result = _jacobian_double(result)
+        for digits, odd in expanded:
+            if i >= len(digits):
+                continue
+            digit = digits[i]
+            if digit > 0:
+                result = _jacobian_add(result, odd[digit >> 1])
+            elif digit < 0:
+                result = _jacobian_add(result, _jacobian_negate(odd[-digit >> 1]))
+    return result
+
+
+# secp256k1 has an efficiently computable endomorphism: multiplying a point
+# by LAMBDA is the same as multiplying its x coordinate by BETA. Splitting a
+# scalar k into k1 + k2 * LAMBDA with k1, k2 around 128 bits halves the
+# number of doublings of a scalar multiplication (Gallant-Lambert-Vanstone).
+BETA = 0x7ae96a2b657c07106e64479eac3434e99cf0497512f58995c1396c28719501ee
+LAMBDA = 0x5363ad4cc05c30e0a5261c028812645a122e22ea20816678df02967c1b23bd72
+
+# Short basis of the lattice {(a, b) : a + b * LAMBDA = 0 mod N}.
+_GLV_A1 = 0x3086d221a7d46bcde86c90e49284eb15
+_GLV_B1 = -0xe4437ed6010e88286f547fa90abfe4c3
+_GLV_A2 = 0x114ca50f7a8e2f3f657c1108d9d44cfd8
+_GLV_B2 = _GLV_A1
+
+
+def split_scalar(k):
+    """
+    Returns (k1, k2) such that k1 + k2 * LAMBDA = k mod N, with both halves
+    at most about 128 bits long. Either half may be negative.
+    """
+    c1 = (_GLV_B2 * k + N // 2) // N
+    c2 = (-_GLV_B1 * k + N // 2) // N
+    k1 = k - c1 * _GLV_A1 - c2 * _GLV_A2
+    k2 = -c1 * _GLV_B1 - c2 * _GLV_B2
+    return k1, k2
+
+
+def _glv_terms(k, p1):
+    """
+    Rewrite the term k * p1 as two terms with half-length coefficients.
+    """
+    k1, k2 = split_scalar(k)
+    x1, y1, z1 = p1
+    p2 = (BETA * x1 % _P, y1, z1)
+    terms = []
+    for k, point in ((k1, p1), (k2, p2)):
+        if k < 0:
+            terms.append((-k, _jacobian_negate(point)))
+        elif k:
+            terms.append((k, point))
+    return terms
+
+
+def _to_affine(p1):
+    """
+    Convert a Jacobian point back to affine (x, y) ints, or (None, None)
+    for the point at infinity.
+    """
+    x1, y1, z1 = p1
+    if not z1:
+        return None, None
+    z_inv = pow(z1, -1, _P)
+    z_inv2 = z_inv * z_inv % _P
+    return int(x1 * z_inv2 % _P), int(y1 * z_inv2 * z_inv % _P)
+
+
+def _batch_invert(values):
+    """
+    Invert a list of ints modulo P with one modular exponentiation. Zeros
+    are skipped and stay zero.
+    """
+    prefix = []
+    acc = 1
+    for v in values:
+        prefix.append(acc)
+        if v:
+            acc = acc * v % _P
+    inv = pow(acc, -1, _P)
+    result = [0] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        v = values[i]
+        if v:
+            result[i] = prefix[i] * inv % _P
+            inv = inv * v % _P
+    return result
+
+
+def _batch_to_affine(points):
+    """
+    Convert many Jacobian points to affine (x, y) ints sharing a single
+    inversion. The point at infinity becomes (None, None).
+    """
+    z_invs = _batch_invert([z for _, _, z in points])
+    result = []
+    for (x1, y1, z1), z_inv in zip(points, z_invs):
+        if not z1:
+            result.append((None, None))
+            continue
+        z_inv2 = z_inv * z_inv % _P
+        result.append((int(x1 * z_inv2 % _P), int(y1 * z_inv2 * z_inv % _P)))
+    return result
+
+
+class _FixedBaseTable(object):
+    """
+    Precomputed multiples of a point that is known in advance.
+
+    The scalar is cut into windows of `width` bits. Row i holds
+    d * 2^(width*i) * point for every digit d, in affine coordinates, so a
+    multiplication is one mixed addition per non-zero window and needs no
+    doublings at all. A wider window means fewer additions but a table that
+    grows as 2^width.
+    """
+
+    def __init__(self, p1, width=4):
+        self.width = width
+        points = []
+        base = p1
+        for _ in range(-(-256 // width)):
+            current = base
+            for _ in range(1, 2**width):
+                points.append(current)
+                current = _jacobian_add(current, base)
+            base = current
+        mpz = backend.mpz
+        affine = [(mpz(x), mpz(y)) for x, y in _batch_to_affine(points)]
+        size = 2**width - 1
+        self.rows = [[None] + affine[i:i + size]
+                     for i in range(0, len(affine), size)]
+
+    def multiply(self, coefficient):
+        """
+        Returns coefficient * point as a Jacobian point.
+        """
+        mask = 2**self.width - 1
+        result = _INFINITY
+        for row in self.rows:
+            digit = coefficient & mask
+            if digit:
+                result = _jacobian_add_affine(result, *row[digit])
+            coefficient >>= self.width
+        return result
+
+
+class _MappedTable(_FixedBaseTable):
+    """
+    A fixed-base table read straight from a memory-mapped table file (see
+    save_table), so forked processes share its pages.
+    """
+
+    def __init__(self, buf, offset, width):
+        self.width = width
+        self._buf = buf
+        self._offset = offset
+
+    def multiply(self, coefficient):
+        mask = 2**self.width - 1
+        mpz = backend.mpz
+        buf = self._buf
+        offset = self._offset
+        row_size = 64 * mask
+        result = _INFINITY
+        while coefficient:
+            digit = coefficient & mask
+            if digit:
+                start = offset + 64 * (digit - 1)
+                x = mpz(int.from_bytes(buf[start:start + 32], 'big'))
+                y = mpz(int.from_bytes(buf[start + 32:start + 64], 'big'))
+                result = _jacobian_add_affine(result, x, y)
+            coefficient >>= self.width
+            offset += row_size
+        return result
+
+
+_FIELD_A = S256Field(A)
+_FIELD_B = S256Field(B)
+
+
 class S256Point(Point):
+    __slots__ = ()
+
     def __init__(self, x, y, *args, **kwargs):
-        a = S256Field(A)
-        b = S256Field(B)
         if type(x) == int:
             x = S256Field(x)
             y = S256Field(y)
-        super().__init__(x, y, a, b)
+        super().__init__(x, y, _FIELD_A, _FIELD_B)
+
+    @classmethod
+    def _new(cls, x, y):
+        """
+        Build a point from affine int coordinates (or None, None) that are
+        known to be on the curve, skipping the checks of the constructor.
+        """
+        point = object.__new__(cls)
+        if x is None:
+            point.x = point.y = None
+        else:
+            point.x = S256Field._new(x)
+            point.y = S256Field._new(y)
+        point.a = _FIELD_A
+        point.b = _FIELD_B
+        return point
 
     def __str__(self):
         if self.x == None and self.y == None:
@@ -196,16 +642,120 @@ class S256Point(Point):
         else:
             return f'S256Point({hex(self.x.val)}, {hex(self.y.val)})'
 
+    SCALAR_METHOD = 'wnaf'
+    WNAF_WIDTH = 5
+    # Whether to split scalars with the GLV endomorphism.
+    USE_ENDOMORPHISM = True
+
+    def __add__(self, other):
+        if other.__class__ is not S256Point:
+            return super().__add__(other)
+        total = _jacobian_add(self._jacobian(), other._jacobian())
+        return S256Point._new(*_to_affine(total))
+
     def __rmul__(self, coefficient):
-        coef = coefficient % N
-        return super().__rmul__(coef)
+        return S256Point._new(*_to_affine(_multi_multiply([(coefficient, self)])))
+
+    @staticmethod
+    def multi_mul(terms):
+        """
+        Returns the sum of coefficient * point for a list of
+        (coefficient, point) pairs, e.g. multi_mul([(u, G), (v, P)]).
+        """
+        return S256Point._new(*_to_affine(_multi_multiply(terms)))
+
+    @property
+    def is_generator(self):
+        return not self.is_identity and self.x.val == G.x.val \
+            and self.y.val == G.y.val
+
+    def _jacobian(self):
+        """
+        Return this point as a tuple of Jacobian coordinates (X, Y, Z).
+        """
+        if self.is_identity:
+            return _INFINITY
+        mpz = backend.mpz
+        return (mpz(self.x.val), mpz(self.y.val), mpz(1))
 
     def verify(self, z, sig):
-        s_inv = pow(sig.s, N-2, N)
+        if not (0 < sig.r < N and 0 < sig.s < N):
+            return False
+        cache = signature_cache
+        if cache is not None and cache.contains(z, sig, self):
+            return True
+        s_inv = backend.invert(sig.s, N)
         u = z * s_inv % N
         v = sig.r * s_inv % N 
-        point = (u * G) + (v * self)
-        return point.x.val == sig.r
+        total = _multi_multiply([(u, G), (v, self)])
+        if not _x_matches(total, sig.r):
+            return False
+        if cache is not None:
+            cache.add(z, sig, self)
+        return True
+
+    def xonly(self):
+        """
+        Serialize the point as a BIP340 x-only public key.
+        """
+        return self.x.val.to_bytes(32, 'big')
+
+    @staticmethod
+    def lift_x(x):
+        """
+        Returns the point with the given x coordinate and an even y, as
+        BIP340 does for x-only public keys.
+        """
+        if isinstance(x, (bytes, bytearray)):
+            x = int.from_bytes(x, 'big')
+        if not 0 <= x < P:
+            raise ValueError('x is not a field element.')
+        alpha = (pow(x, 3, P) + B) % P
+        y = backend.powmod(alpha, (P + 1) // 4, P)
+        if y * y % P != alpha:
+            raise ValueError(f'No point on the curve with x {x:x}.')
+        return S256Point._new(x, y if y % 2 == 0 else P - y)
+
+    def verify_schnorr(self, msg, sig):
+        """
+        Verify a BIP340 signature on msg for this point, taken as an
+        x-only public key.
+        """
+        if sig.r >= P or sig.s >= N:
+            return False
+        e = _schnorr_challenge(sig.r, self.xonly(), msg)
+        total = _multi_multiply([(sig.s, G), (N - e, S256Point.lift_x(self.x.val))])
+        x, y = _to_affine(total)
+        return x is not None and y % 2 == 0 and x == sig.r
+
+    @staticmethod
+    def recover(z, sig, recid):
+        """
+        Returns the public key that produced sig over z, given the recovery
+        id from PrivateKey.sign_recoverable. Bit 0 of recid is the parity
+        of the nonce point's y and bit 1 tells whether its x was N or more.
+        """
+        if not 0 <= recid <= 3:
+            raise ValueError(f'Invalid recovery id: {recid}')
+        if not (0 < sig.r < N and 0 < sig.s < N):
+            raise BadSignature
+        x = sig.r + N if recid & 2 else sig.r
+        try:
+            point = S256Point.lift_x(x)
+        except ValueError:
+            raise BadSignature
+        if recid & 1:
+            point = S256Point._new(x, P - point.y.val)
+        # Q = r^-1 (sR - zG)
+        r_inv = backend.invert(sig.r, N)
+        total = _multi_multiply([
+            (sig.s * r_inv % N, point),
+            (-z * r_inv % N, G),
+        ])
+        x, y = _to_affine(total)
+        if x is None:
+            raise BadSignature
+        return S256Point._new(x, y)
 
     def sec(self, compressed=True):
         """
@@ -221,11 +771,24 @@ class S256Point(Point):
             return b'\x04' + self.x.val.to_bytes(32, 'big') \
                            + self.y.val.to_bytes(32, 'big')
 
+    # Parsed points keyed on their SEC bytes. Resize it with
+    # S256Point.parse_cache.resize(n), or to 0 to disable it.
+    parse_cache = LRUCache(maxsize=10000)
+
     @staticmethod
     def parse(sec_bin):
         """
         Returns a Point object from a SEC binary.
         """
+        sec_bin = bytes(sec_bin)
+        point = S256Point.parse_cache.get(sec_bin)
+        if point is None:
+            point = S256Point._parse(sec_bin)
+            S256Point.parse_cache.put(sec_bin, point)
+        return point
+
+    @staticmethod
+    def _parse(sec_bin):
         if sec_bin[0] == 4:
             x = int.from_bytes(sec_bin[1:33], 'big')
             y = int.from_bytes(sec_bin[33:65], 'big')
@@ -257,17 +820,475 @@ class S256Point(Point):
             prefix = b'\x00'
         return encode_base58_checksum(prefix + h160)
 
+    def p2wpkh_address(self, testnet=False):
+        """
+        Return the native segwit (P2WPKH) address of the compressed key.
+        """
+        return encode_segwit_address(0, hash160(self.sec()), testnet)
+
+    def taproot_output_key(self):
+        """
+        Returns the BIP86 output key: this point, taken with an even y,
+        tweaked by the hash of its x coordinate alone (no script tree).
+        """
+        internal = S256Point.lift_x(self.x.val)
+        t = int.from_bytes(tagged_hash('TapTweak', internal.xonly()), 'big')
+        if t >= N:
+            raise ValueError('Taproot tweak out of range.')
+        x, y = _to_affine(_multi_multiply([(1, internal), (t, G)]))
+        if x is None:
+            raise ValueError('Taproot output key is the point at infinity.')
+        return S256Point._new(x, y)
+
+    def p2tr_address(self, testnet=False):
+        """
+        Return the Taproot (P2TR) address for this point as a BIP86
+        internal key.
+        """
+        return encode_segwit_address(
+            1, self.taproot_output_key().xonly(), testnet)
+
 
 G = S256Point(
     0x79be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798, 
     0x483ada7726a3c4655da4fbfc0e1108a8fd17b448a68554199c47d08ffb10d4b8
 )
 
+# Window width of the fixed-base table for G. The table is built on first
+# use: width 4 holds 960 points, width 8 holds 8160 points and does half as
+# many additions per multiplication.
+GENERATOR_TABLE_WIDTH = 4
+
+_GENERATOR_TABLE = None
+
+
+def _generator_table():
+    global _GENERATOR_TABLE
+    if _GENERATOR_TABLE is None or \
+            _GENERATOR_TABLE.width != GENERATOR_TABLE_WIDTH:
+        _GENERATOR_TABLE = _FixedBaseTable(G._jacobian(), GENERATOR_TABLE_WIDTH)
+    return _GENERATOR_TABLE
+
+
+def _multi_multiply(terms):
+    """
+    Jacobian version of S256Point.multi_mul. Terms on the generator are
+    folded together and go through its fixed-base table, the others are
+    interleaved so they share their doublings.
+    """
+    g_coef = 0
+    others = []
+    tabled = _INFINITY
+    for coefficient, point in terms:
+        if point.is_identity:
+            continue
+        if point.is_generator:
+            g_coef += coefficient
+            continue
+        table = point_tables.lookup(point) if point_tables is not None else None
+        if table is not None:
+            tabled = _jacobian_add(tabled, table.multiply(coefficient % N))
+        elif S256Point.USE_ENDOMORPHISM:
+            others += _glv_terms(coefficient % N, point._jacobian())
+        else:
+            others.append((coefficient % N, point._jacobian()))
+    if S256Point.SCALAR_METHOD == 'wnaf':
+        result = _jacobian_multi_multiply(others, S256Point.WNAF_WIDTH)
+    else:
+        result = _jacobian_multi_multiply(others)
+    if g_coef % N:
+        result = _jacobian_add(result, _generator_table().multiply(g_coef % N))
+    return _jacobian_add(result, tabled)
+
+
+class PointTableRegistry(object):
+    """
+    Builds fixed-base tables for public keys that keep coming back.
+
+    Every lookup counts how often a point has been seen. Once a point has
+    been seen `threshold` times a table of `width` bits is built for it and
+    multiplications by that point need no doublings from then on. Tables
+    are evicted least recently used first to stay within max_bytes, and an
+    evicted point has to be seen `threshold` times again to get its table
+    back, so more hot points than table slots do not rebuild a table on
+    every lookup.
+    """
+
+    # Approximate memory taken by one table entry: a tuple of two 256-bit
+    # ints.
+    ENTRY_BYTES = 176
+
+    def __init__(self, threshold=8, max_bytes=64 * 1024 * 1024, width=4,
+                 max_tracked=100000):
+        self.threshold = threshold
+        self.width = width
+        self.max_bytes = max_bytes
+        if max_bytes < self.table_bytes:
+            raise ValueError(
+                f'max_bytes is below the size of one table ({self.table_bytes}).')
+        self.tables = LRUCache(maxsize=max_bytes // self.table_bytes)
+        self._counts = LRUCache(maxsize=max_tracked)
+
+    @property
+    def table_bytes(self):
+        return -(-256 // self.width) * (2**self.width - 1) * self.ENTRY_BYTES
+
+    def lookup(self, point):
+        """
+        Returns the table of the point, or None if it is not hot (yet).
+        """
+        key = (point.x.val, point.y.val)
+        table = self.tables.get(key)
+        if table is not None:
+            return table
+        count = self._counts.get(key, 0) + 1
+        if count < self.threshold:
+            self._counts.put(key, count)
+            return None
+        self._counts.pop(key)
+        table = _FixedBaseTable(point._jacobian(), self.width)
+        self.tables.put(key, table)
+        return table
+
+    def info(self):
+        return self.tables.info()
+
+
+backend.on_change(_sync_backend)
+_sync_backend()
+
+
+# Opt-in registry of tables for hot public keys, used by every
+# multiplication on the curve, e.g.
+#     ecc.point_tables = ecc.PointTableRegistry(threshold=8)
+point_tables = None
+
+
+# Table files start with a header holding a magic string, the format
+# version, the window width, the number of rows and the SHA256 of the rest
+# of the file. Then comes the base point and every table entry, each as
+# 32-byte big-endian x and y.
+TABLE_MAGIC = b'BTCTAB'
+TABLE_VERSION = 1
+_TABLE_HEADER = struct.Struct('<6sBBH32s')
+
+
+def save_table(path, point=None, width=None):
+    """
+    Write the fixed-base table of a point (G by default) to a file that
+    load_table can map back in.
+    """
+    if point is None or point.is_generator:
+        point = G
+        if width is None or width == GENERATOR_TABLE_WIDTH:
+            table = _generator_table()
+        else:
+            table = _FixedBaseTable(G._jacobian(), width)
+    else:
+        table = _FixedBaseTable(point._jacobian(), width or 4)
+    if isinstance(table, _MappedTable):
+        raise ValueError('Table is already loaded from a file.')
+    body = point.x.val.to_bytes(32, 'big') + point.y.val.to_bytes(32, 'big')
+    body += b''.join(int(x).to_bytes(32, 'big') + int(y).to_bytes(32, 'big')
+                     for row in table.rows for x, y in row[1:])
+    header = _TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, table.width,
+                                len(table.rows), hashlib.sha256(body).digest())
+    with open(path, 'wb') as f:
+        f.write(header + body)
+
+
+def load_table(path):
+    """
+    Memory-map a table written by save_table and start using it. A table
+    for G replaces the generator table, a table for any other point goes
+    into ecc.point_tables, which has to be set. Returns the point.
+    """
+    with open(path, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return _load_table(path, buf)
+    except Exception:
+        buf.close()
+        raise
+
+
+def _load_table(path, buf):
+    if len(buf) < _TABLE_HEADER.size + 64:
+        raise ValueError(f'{path} is not a table file.')
+    magic, version, width, rows, checksum = _TABLE_HEADER.unpack_from(buf)
+    if magic != TABLE_MAGIC:
+        raise ValueError(f'{path} is not a table file.')
+    if version != TABLE_VERSION:
+        raise ValueError(f'Unsupported table version {version}.')
+    if width < 1 or rows != -(-256 // width):
+        raise ValueError(f'{path} has a bad table layout.')
+    body_size = 64 + rows * (2**width - 1) * 64
+    if len(buf) != _TABLE_HEADER.size + body_size or \
+            hashlib.sha256(buf[_TABLE_HEADER.size:]).digest() != checksum:
+        raise ValueError(f'{path} is corrupted.')
+
+    offset = _TABLE_HEADER.size
+    point = S256Point(int.from_bytes(buf[offset:offset + 32], 'big'),
+                      int.from_bytes(buf[offset + 32:offset + 64], 'big'))
+    if not point.is_generator and point_tables is None:
+        raise ValueError('Set ecc.point_tables before loading a table '
+                         'for a point other than G.')
+    table = _MappedTable(buf, offset + 64, width)
+    if point.is_generator:
+        global _GENERATOR_TABLE, GENERATOR_TABLE_WIDTH
+        _GENERATOR_TABLE = table
+        GENERATOR_TABLE_WIDTH = width
+    else:
+        point_tables.tables.put((point.x.val, point.y.val), table)
+    return point
+
+
+def precompute_generator_table():
+    """
+    Build the fixed-base table of G now, e.g. before forking workers so
+    they share it instead of building their own.
+    """
+    _generator_table()
+
+
+def generator_multiples(scalars, offset=None):
+    """
+    Returns k * G + offset for every scalar k, as affine (x, y) ints, or
+    (None, None) for the point at infinity. offset is an S256Point and
+    defaults to nothing. The points go through the fixed-base table and
+    share a single inversion.
+    """
+    table = _generator_table()
+    points = [table.multiply(k % N) for k in scalars]
+    if offset is not None and not offset.is_identity:
+        ox, oy = offset.x.val, offset.y.val
+        points = [_jacobian_add_affine(p, ox, oy) for p in points]
+    return _batch_to_affine(points)
+
+
+def generator_sequence(start, count):
+    """
+    Returns (start + i) * G for i in range(count), as affine (x, y) ints
+    like generator_multiples. Each point is the previous one plus G, which
+    is much cheaper than a multiplication per point.
+    """
+    gx, gy = G.x.val, G.y.val
+    point = _generator_table().multiply(start % N)
+    points = []
+    for _ in range(count):
+        points.append(point)
+        point = _jacobian_add_affine(point, gx, gy)
+    return _batch_to_affine(points)
+
+
+def addresses_for_secrets(secrets, compressed=True, testnet=False):
+    """
+    Returns the addresses of many secrets at once. The public keys are
+    computed in Jacobian coordinates and normalized with a single shared
+    inversion before hashing.
+    """
+    points = generator_multiples(secrets)
+    if testnet:
+        prefix = b'\x6f'
+    else:
+        prefix = b'\x00'
+    addresses = []
+    for x, y in points:
+        if compressed:
+            sec = (b'\x03' if y & 1 else b'\x02') + x.to_bytes(32, 'big')
+        else:
+            sec = b'\x04' + x.to_bytes(32, 'big') + y.to_bytes(32, 'big')
+        addresses.append(encode_base58_checksum(prefix + hash160(sec)))
+    return addresses
+
+
+def _x_matches(p1, r):
+    """
+    Check that the affine x of a Jacobian point is r modulo N, without
+    converting the point back to affine coordinates.
+    """
+    x1, _, z1 = p1
+    if not z1:
+        return False
+    zz = z1 * z1 % _P
+    if x1 == r * zz % _P:
+        return True
+    return r + N < P and x1 == (r + N) * zz % _P
+
+
+def batch_verify(items):
+    """
+    Verify a list of (z, signature, point) triples. Returns a list with one
+    boolean per triple.
+
+    An ECDSA signature only carries the x coordinate of its nonce point R,
+    so the signs needed to fold many signatures into a single random linear
+    combination are unknown. Instead every check is done in Jacobian
+    coordinates against r * Z^2, so the batch needs no field inversion.
+    """
+    cache = signature_cache
+    results = []
+    for z, sig, point in items:
+        if not (0 < sig.r < N and 0 < sig.s < N):
+            results.append(False)
+            continue
+        if cache is not None and cache.contains(z, sig, point):
+            results.append(True)
+            continue
+        s_inv = backend.invert(sig.s, N)
+        u = z * s_inv % N
+        v = sig.r * s_inv % N
+        total = _multi_multiply([(u, G), (v, point)])
+        ok = _x_matches(total, sig.r)
+        if ok and cache is not None:
+            cache.add(z, sig, point)
+        results.append(ok)
+    return results
+
+
+class SignatureCache(object):
+    """
+    Remembers (z, signature, point) triples that verified successfully, so
+    checking the same signature again (e.g. first in the mempool and then
+    in a block) is a lookup.
+
+    Entries are salted SHA256 digests, so the keys cannot be predicted from
+    the signatures. The cache holds roughly max_bytes worth of entries and
+    evicts the least recently used first, so a flood of fresh valid
+    signatures can still push out everything that was cached before.
+    """
+
+    # Approximate memory taken by one entry: the 32 byte digest plus the
+    # bookkeeping of the underlying ordered dict.
+    ENTRY_BYTES = 160
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.salt = os.urandom(32)
+        self._hasher = hashlib.sha256(self.salt)
+        self._entries = LRUCache(maxsize=max_bytes // self.ENTRY_BYTES)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _key(self, z, sig, point):
+        h = self._hasher.copy()
+        h.update((z % N).to_bytes(32, 'big'))
+        h.update(sig.r.to_bytes(32, 'big'))
+        h.update(sig.s.to_bytes(32, 'big'))
+        h.update(point.x.val.to_bytes(32, 'big'))
+        h.update(point.y.val.to_bytes(32, 'big'))
+        return h.digest()
+
+    def contains(self, z, sig, point):
+        return self._entries.get(self._key(z, sig, point)) is not None
+
+    def add(self, z, sig, point):
+        self._entries.put(self._key(z, sig, point), True)
+
+    def resize(self, max_bytes):
+        self._entries.resize(max_bytes // self.ENTRY_BYTES)
+
+    def clear(self):
+        self._entries.clear()
+
+    def info(self):
+        """
+        Returns a dict with the hit, miss and eviction counters, the number
+        of entries and the memory budget.
+        """
+        info = self._entries.info()
+        info['max_bytes'] = info.pop('maxsize') * self.ENTRY_BYTES
+        return info
+
+
+# Shared cache of verified signatures used by S256Point.verify and
+# batch_verify. Set it to None to always do the curve math.
+signature_cache = SignatureCache()
+
+
+def _schnorr_challenge(r, xonly, msg):
+    data = r.to_bytes(32, 'big') + xonly + msg
+    return int.from_bytes(tagged_hash('BIP0340/challenge', data), 'big') % N
+
+
+class SchnorrSignature(object):
+    """
+    A BIP340 signature: the x coordinate of the nonce point and s.
+    """
+
+    def __init__(self, r, s):
+        self.r = r
+        self.s = s
+
+    def __str__(self):
+        return f'SchnorrSignature({self.r},{self.s})'
+
+    def __eq__(self, other):
+        return self.r == other.r and self.s == other.s
+
+    def serialize(self):
+        return self.r.to_bytes(32, 'big') + self.s.to_bytes(32, 'big')
+
+    @staticmethod
+    def parse(signature_bin):
+        if len(signature_bin) != 64:
+            raise BadSignature
+        return SchnorrSignature(int.from_bytes(signature_bin[:32], 'big'),
+                                int.from_bytes(signature_bin[32:], 'big'))
+
+
+def schnorr_batch_verify(items):
+    """
+    Verify a list of (msg, signature, point) BIP340 triples. Returns a list
+    with one boolean per triple.
+
+    The whole batch is checked with a single multi-scalar multiplication
+    over a random linear combination of the verification equations,
+        (sum a_i s_i) G - sum a_i R_i - sum a_i e_i P_i = 0.
+    When that fails, the batch is split in halves to find the bad ones.
+    """
+    results = [False] * len(items)
+    prepared = []
+    for i, (msg, sig, point) in enumerate(items):
+        if sig.r >= P or sig.s >= N:
+            continue
+        try:
+            nonce = S256Point.lift_x(sig.r)
+        except ValueError:
+            continue
+        e = _schnorr_challenge(sig.r, point.xonly(), msg)
+        prepared.append((i, sig.s, nonce, e, S256Point.lift_x(point.x.val)))
+
+    def check(group):
+        g_coef = 0
+        terms = []
+        for n, (_, s, nonce, e, point) in enumerate(group):
+            a = 1 if n == 0 else secrets.randbelow(N - 1) + 1
+            g_coef += a * s
+            terms.append((N - a, nonce))
+            terms.append((-a * e % N, point))
+        terms.append((g_coef % N, G))
+        return not _multi_multiply(terms)[2]
+
+    pending = [prepared] if prepared else []
+    while pending:
+        group = pending.pop()
+        if check(group):
+            for item in group:
+                results[item[0]] = True
+        elif len(group) > 1:
+            half = len(group) // 2
+            pending += [group[:half], group[half:]]
+    return results
+
 
 class Signature(object):
+    __slots__ = ('r', 's', '_der')
+
     def __init__(self, r, s):
         self.r = r
         self.s = s
+        self._der = None
 
     def __str__(self):
         return f'Signature({self.r},{self.s})'
@@ -277,8 +1298,13 @@ class Signature(object):
 
     def der(self):
         """
-        Serialize the signature to DER format.
+        Serialize the signature to DER format. The encoding is computed
+        once and kept on the object.
         """
+        cached = self._der
+        if cached is not None and cached[0] == self.r and cached[1] == self.s:
+            return cached[2]
+
         rbin = self.r.to_bytes(32, 'big')
         rbin = rbin.lstrip(b'\x00')
         if rbin[0] & 0x80:
@@ -291,34 +1317,168 @@ class Signature(object):
             sbin = b'\x00' + sbin
         result += bytes([2, len(sbin)]) + sbin
 
-        return bytes([0x30, len(result)]) + result
+        result = bytes([0x30, len(result)]) + result
+        self._der = (self.r, self.s, result)
+        return result
 
     @staticmethod
-    def parse(signature_bin):
+    def parse(signature_bin, offset=0, length=None):
         """
-        Parse signature from DER format bytes.
+        Parse signature from strict DER format (BIP66), without the sighash
+        byte. `signature_bin` may be bytes or a memoryview, and `offset` and
+        `length` select the signature inside it without copying. The DER
+        bytes are not copied either: der() encodes them again on demand.
         """
-        stream = BytesIO(signature_bin)
-        compound = stream.read(1)[0]
-        if compound != 0x30:
+        if length is None:
+            length = len(signature_bin) - offset
+        # 0x30 [total] 0x02 [R length] [R] 0x02 [S length] [S]
+        if length < 8 or length > 72:
+            raise BadSignature
+        b = signature_bin
+        i = offset
+        if b[i] != 0x30 or b[i + 1] != length - 2 or b[i + 2] != 0x02:
+            raise BadSignature
+        r_length = b[i + 3]
+        if r_length == 0 or r_length + 5 >= length:
+            raise BadSignature
+        s_length = b[i + r_length + 5]
+        if r_length + s_length + 6 != length or s_length == 0:
+            raise BadSignature
+        if b[i + r_length + 4] != 0x02:
             raise BadSignature
-        length = stream.read(1)[0]
-        if length + 2 != len(signature_bin):
+        # Both integers must be positive and minimally encoded.
+        r_start = i + 4
+        if b[r_start] & 0x80:
             raise BadSignature
-        marker = stream.read(1)[0]
-        if marker != 0x02:
+        if r_length > 1 and b[r_start] == 0 and not b[r_start + 1] & 0x80:
             raise BadSignature
-        r_length = stream.read(1)[0]
-        r = int.from_bytes(stream.read(r_length), 'big')
-        marker = stream.read(1)[0]
-        if marker != 0x02:
+        s_start = r_start + r_length + 2
+        if b[s_start] & 0x80:
             raise BadSignature
-        s_length = stream.read(1)[0]
-        s = int.from_bytes(stream.read(s_length), 'big')
-        if len(signature_bin) != r_length + s_length + 6:
+        if s_length > 1 and b[s_start] == 0 and not b[s_start + 1] & 0x80:
             raise BadSignature
 
-        return Signature(r, s)
+        r = int.from_bytes(b[r_start:r_start + r_length], 'big')
+        s = int.from_bytes(b[s_start:s_start + s_length], 'big')
+        signature = Signature(r, s)
+        # Strict DER is canonical, so der() rebuilds the same bytes when
+        # asked. Only an exact bytes input is kept, as that costs no copy.
+        if b.__class__ is bytes and length == len(b):
+            signature._der = (r, s, b)
+        return signature
+
+    @staticmethod
+    def parse_many(signatures):
+        """
+        Parse a sequence of DER signatures. Entries that are not strict DER
+        come back as None instead of raising.
+        """
+        parse = Signature.parse
+        results = []
+        for signature_bin in signatures:
+            try:
+                results.append(parse(signature_bin))
+            except BadSignature:
+                results.append(None)
+        return results
+
+
+class NoncePool(object):
+    """
+    A supply of precomputed signing nonces (k, r, k_inv), with k drawn from
+    the operating system CSPRNG. Every nonce is handed out exactly once.
+
+    After start() a daemon thread keeps the pool topped up to `size`, so a
+    burst of signatures does not wait on generator multiplications. When
+    the pool runs dry, get() computes a fresh nonce inline.
+
+    A forked child starts with an empty pool, so a parent and its children
+    never share the nonces queued before the fork.
+    """
+
+    def __init__(self, size=256):
+        self.size = size
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._nonces = queue.Queue(maxsize=self.size)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _check_fork(self):
+        """
+        Drop everything inherited from the parent process after a fork,
+        and restart the refill thread if the parent had one running.
+        """
+        if self._pid == os.getpid():
+            return
+        refilling = self._thread is not None
+        self._reset()
+        if refilling:
+            self.start()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def __len__(self):
+        self._check_fork()
+        return self._nonces.qsize()
+
+    @staticmethod
+    def _make_nonce():
+        while True:
+            k = secrets.randbelow(N - 1) + 1
+            r = _generator_table().multiply(k)
+            x, _ = _to_affine(r)
+            r = x % N
+            if r:
+                return k, r, backend.invert(k, N)
+
+    def _refill(self, nonces, stop):
+        while not stop.is_set():
+            nonce = self._make_nonce()
+            while not stop.is_set():
+                try:
+                    nonces.put(nonce, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def start(self):
+        self._check_fork()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._refill, args=(self._nonces, self._stop),
+                daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._check_fork()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def fill(self):
+        """
+        Fill the pool up to its size in the calling thread.
+        """
+        self._check_fork()
+        while not self._nonces.full():
+            self._nonces.put(self._make_nonce())
+
+    def get(self):
+        self._check_fork()
+        try:
+            return self._nonces.get_nowait()
+        except queue.Empty:
+            return self._make_nonce()
 
 
 class PrivateKey(object):
@@ -329,15 +1489,62 @@ class PrivateKey(object):
     def __str__(self):
         return '{:x}'.format(self.secret).zfill(64)
 
-    def sign(self, z):
-        k = randint(0, N)
-        r = (k * G).x.val
-        k_inv = pow(k, N-2, N)
+    def sign(self, z, nonce_pool=None):
+        """
+        Sign z. With a NoncePool the nonce and its point come precomputed
+        from the pool, which leaves only a few modular multiplications.
+        """
+        if nonce_pool is not None:
+            k, r, k_inv = nonce_pool.get()
+        else:
+            k = randint(0, N)
+            r = (k * G).x.val
+            k_inv = backend.invert(k, N)
         s = (z + r * self.secret) * k_inv % N
         if s > N/2:
             s = N - s
         return Signature(r, s)
 
+    def sign_recoverable(self, z):
+        """
+        Sign z and also return the recovery id (0 to 3) that lets
+        S256Point.recover find the public key from the signature.
+        """
+        while True:
+            k = secrets.randbelow(N - 1) + 1
+            x, y = _to_affine(_generator_table().multiply(k))
+            r = x % N
+            s = (z + r * self.secret) * backend.invert(k, N) % N
+            if r and s:
+                break
+        recid = (y & 1) | (2 if x >= N else 0)
+        # Negating s negates the nonce point, which flips its y parity.
+        if s > N // 2:
+            s = N - s
+            recid ^= 1
+        return Signature(r, s), recid
+
+    def sign_schnorr(self, msg, aux_rand=None):
+        """
+        Sign msg with BIP340. aux_rand is 32 bytes of fresh randomness and
+        is drawn from the OS when not given.
+        """
+        if aux_rand is None:
+            aux_rand = os.urandom(32)
+        point = self.point
+        d = self.secret if point.y.val % 2 == 0 else N - self.secret
+        t = d ^ int.from_bytes(tagged_hash('BIP0340/aux', aux_rand), 'big')
+        xonly = point.xonly()
+        rand = tagged_hash('BIP0340/nonce', t.to_bytes(32, 'big') + xonly + msg)
+        k = int.from_bytes(rand, 'big') % N
+        if not k:
+            raise ValueError('Nonce is zero, retry with other aux_rand.')
+        r_x, r_y = _to_affine(_generator_table().multiply(k))
+        if r_y % 2:
+            k = N - k
+        e = _schnorr_challenge(r_x, xonly, msg)
+        return SchnorrSignature(r_x, (k + e * d) % N)
+
     def wif(self, compressed=True, testnet=False):
         secret_bytes = self.secret.to_bytes(32, 'big')
         if testnet:
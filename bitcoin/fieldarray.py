@@ -0,0 +1,250 @@
+"""
+Vectorized arithmetic over small prime fields with NumPy.
+
+FieldElement and Point handle one value at a time, which is fine for
+secp256k1 but makes walking a whole group over a small prime take millions
+of Python objects. FieldArray and PointArray hold many elements of the same
+field in NumPy arrays instead. This module needs NumPy.
+"""
+import numpy as np
+
+from .ecc import FieldElement, Point
+
+
+class FieldArray(object):
+    """
+    Many elements of the same finite field.
+
+    For primes below 2^32 the values live in a uint64 array, where products
+    cannot overflow. Larger primes, up to 64 bits, use an object array of
+    Python ints: still vectorized, but slower.
+
+    Attributes
+    ----------
+    values : numpy.ndarray
+        The field elements.
+    prime : int
+        The size of the finite field.
+    """
+
+    def __init__(self, values, prime):
+        if prime >= 2**64:
+            raise ValueError(f'Prime {prime} does not fit in 64 bits.')
+        values = np.asarray(values, dtype=_dtype(prime))
+        if len(values) and (values.min() < 0 or values.max() >= prime):
+            raise ValueError(f'Values not in field range 0 to {prime}')
+        self.values = values
+        self.prime = prime
+
+    @classmethod
+    def _new(cls, values, prime):
+        array = object.__new__(cls)
+        array.values = values
+        array.prime = prime
+        return array
+
+    @classmethod
+    def arange(cls, prime):
+        """
+        Every element of the field, from 0 to prime - 1.
+        """
+        return cls._new(np.arange(prime, dtype=_dtype(prime)), prime)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return FieldElement(int(self.values[index]), self.prime)
+        return FieldArray._new(self.values[index], self.prime)
+
+    def __str__(self):
+        return f'FieldArray_{self.prime}({list(map(int, self.values))})'
+
+    def __eq__(self, other):
+        """
+        Element-wise comparison, returns a boolean array.
+        """
+        return self.values == self._operand(other)
+
+    def __ne__(self, other):
+        return self.values != self._operand(other)
+
+    def _operand(self, other):
+        if isinstance(other, FieldArray):
+            if other.prime != self.prime:
+                raise TypeError('Cannot combine arrays of different fields.')
+            return other.values
+        if isinstance(other, FieldElement):
+            if other.prime != self.prime:
+                raise TypeError('Cannot combine arrays of different fields.')
+            other = other.val
+        return self.values.dtype.type(other % self.prime)
+
+    def _wrap(self, values):
+        return FieldArray._new(values, self.prime)
+
+    def __add__(self, other):
+        return self._wrap((self.values + self._operand(other)) % self.prime)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        p = self.values.dtype.type(self.prime)
+        return self._wrap((self.values + (p - self._operand(other))) % p)
+
+    def __rsub__(self, other):
+        return -self + other
+
+    def __neg__(self):
+        p = self.values.dtype.type(self.prime)
+        return self._wrap((p - self.values) % p)
+
+    def __mul__(self, other):
+        return self._wrap(self.values * self._operand(other) % self.prime)
+
+    __rmul__ = __mul__
+
+    def __pow__(self, exponent):
+        n = exponent % (self.prime - 1)
+        p = self.values.dtype.type(self.prime)
+        result = np.ones_like(self.values)
+        base = self.values.copy()
+        while n:
+            if n & 1:
+                result = result * base % p
+            base = base * base % p
+            n >>= 1
+        return self._wrap(result)
+
+    def inverse(self):
+        """
+        Element-wise inverse by Fermat's little theorem. Zero stays zero.
+        """
+        return self ** (self.prime - 2)
+
+    def __truediv__(self, other):
+        if not isinstance(other, FieldArray):
+            other = FieldArray([self._operand(other)], self.prime)
+        return self * other.inverse()
+
+    def where(self, mask, other):
+        """
+        Take self where mask is true and other elsewhere.
+        """
+        return self._wrap(np.where(mask, self.values, self._operand(other)))
+
+
+def _dtype(prime):
+    return np.uint64 if prime < 2**32 else object
+
+
+class PointArray(object):
+    """
+    Many points on the same curve y^2 = x^3 + ax + b over a small prime
+    field, with a mask marking the points at infinity.
+    """
+
+    def __init__(self, x, y, a, b, infinity=None):
+        self.x = x
+        self.y = y
+        self.a = a
+        self.b = b
+        if infinity is None:
+            infinity = np.zeros(len(x), dtype=bool)
+        self.infinity = infinity
+
+    @classmethod
+    def from_points(cls, points):
+        a, b = points[0].a, points[0].b
+        prime = a.prime
+        infinity = np.array([p.is_identity for p in points], dtype=bool)
+        x = FieldArray([0 if p.is_identity else p.x.val for p in points], prime)
+        y = FieldArray([0 if p.is_identity else p.y.val for p in points], prime)
+        return cls(x, y, a, b, infinity)
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            if self.infinity[index]:
+                return Point(None, None, self.a, self.b)
+            return Point(self.x[index], self.y[index], self.a, self.b)
+        return PointArray(self.x[index], self.y[index], self.a, self.b,
+                          self.infinity[index])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __neg__(self):
+        return PointArray(self.x, -self.y, self.a, self.b, self.infinity)
+
+    def __add__(self, other):
+        """
+        Element-wise point addition. `other` may be a PointArray of the
+        same length or a single Point added to every element.
+        """
+        if isinstance(other, Point):
+            other = PointArray.from_points([other] * len(self))
+        x1, y1, x2, y2 = self.x, self.y, other.x, other.y
+        same_x = x1 == x2
+        # P + (-P), including doubling a point with y = 0
+        cancel = same_x & ((y1 != y2) | (y1 == 0))
+        doubling = same_x & ~cancel
+
+        numerator = (3 * x1 * x1 + self.a).where(doubling, y2 - y1)
+        denominator = (2 * y1).where(doubling, x2 - x1)
+        s = numerator * denominator.inverse()
+        x3 = s * s - x1 - x2
+        y3 = s * (x1 - x3) - y1
+
+        inf1, inf2 = self.infinity, other.infinity
+        x3 = x3.where(~inf1, x2).where(~inf2, x1)
+        y3 = y3.where(~inf1, y2).where(~inf2, y1)
+        infinity = (inf1 & inf2) | (~inf1 & ~inf2 & cancel)
+        return PointArray(x3, y3, self.a, self.b, infinity)
+
+    def orders(self):
+        """
+        Returns the order of every point, found by adding each point to
+        itself until it reaches the point at infinity.
+        """
+        orders = np.where(self.infinity, 1, 0)
+        current = self
+        k = 1
+        while not orders.all():
+            current = current + self
+            k += 1
+            orders[(orders == 0) & current.infinity] = k
+        return orders
+
+
+def curve_points(a, b, prime):
+    """
+    Returns every affine point on y^2 = x^3 + ax + b over F_prime as a
+    PointArray, the point at infinity not included.
+    """
+    xs = FieldArray.arange(prime)
+    rhs = xs * xs * xs + xs * a + b
+    squares = (xs * xs).values
+    order = np.argsort(squares, kind='stable')
+    sorted_squares = squares[order]
+    lo = np.searchsorted(sorted_squares, rhs.values, side='left')
+    hi = np.searchsorted(sorted_squares, rhs.values, side='right')
+    counts = hi - lo
+    x_values = np.repeat(xs.values, counts)
+    starts = np.repeat(lo, counts)
+    offsets = np.arange(len(x_values)) - np.repeat(np.cumsum(counts) - counts, counts)
+    y_values = order[starts + offsets].astype(xs.values.dtype)
+    return PointArray(
+        FieldArray._new(x_values, prime),
+        FieldArray._new(y_values, prime),
+        FieldElement(a % prime, prime),
+        FieldElement(b % prime, prime),
+    )
@@ -0,0 +1,155 @@
+"""
+RIPEMD-160 backend for hash160 and the script hash opcodes.
+
+hashlib only offers RIPEMD-160 through OpenSSL, and OpenSSL 3 builds that
+leave the legacy provider disabled do not have it. When that is the case
+this module falls back to a pure Python implementation. `NAME` tells which
+backend is active.
+"""
+import hashlib
+import struct
+
+
+_MASK = 0xffffffff
+
+_WORDS = struct.Struct('<16L')
+_DIGEST = struct.Struct('<5L')
+
+_INITIAL_STATE = (0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476, 0xc3d2e1f0)
+
+# Message word and rotation of every step, one tuple of 16 (word, shift)
+# pairs per round, for the left and the right line.
+_LEFT = tuple(tuple(zip(r, s)) for r, s in zip((
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15),
+    (7, 4, 13, 1, 10, 6, 15, 3, 12, 0, 9, 5, 2, 14, 11, 8),
+    (3, 10, 14, 4, 9, 15, 8, 1, 2, 7, 0, 6, 13, 11, 5, 12),
+    (1, 9, 11, 10, 0, 8, 12, 4, 13, 3, 7, 15, 14, 5, 6, 2),
+    (4, 0, 5, 9, 7, 12, 2, 10, 14, 1, 3, 8, 11, 6, 15, 13),
+), (
+    (11, 14, 15, 12, 5, 8, 7, 9, 11, 13, 14, 15, 6, 7, 9, 8),
+    (7, 6, 8, 13, 11, 9, 7, 15, 7, 12, 15, 9, 11, 7, 13, 12),
+    (11, 13, 6, 7, 14, 9, 13, 15, 14, 8, 13, 6, 5, 12, 7, 5),
+    (11, 12, 14, 15, 14, 15, 9, 8, 9, 14, 5, 6, 8, 6, 5, 12),
+    (9, 15, 5, 11, 6, 8, 13, 12, 5, 12, 13, 14, 11, 8, 5, 6),
+)))
+
+_RIGHT = tuple(tuple(zip(r, s)) for r, s in zip((
+    (5, 14, 7, 0, 9, 2, 11, 4, 13, 6, 15, 8, 1, 10, 3, 12),
+    (6, 11, 3, 7, 0, 13, 5, 10, 14, 15, 8, 12, 4, 9, 1, 2),
+    (15, 5, 1, 3, 7, 14, 6, 9, 11, 8, 12, 2, 10, 0, 4, 13),
+    (8, 6, 4, 1, 3, 11, 15, 0, 5, 12, 2, 13, 9, 7, 10, 14),
+    (12, 15, 10, 4, 1, 5, 8, 7, 6, 2, 13, 14, 0, 3, 9, 11),
+), (
+    (8, 9, 9, 11, 13, 15, 15, 5, 7, 7, 8, 11, 14, 14, 12, 6),
+    (9, 13, 15, 7, 12, 8, 9, 11, 7, 7, 12, 7, 6, 15, 13, 11),
+    (9, 7, 15, 11, 8, 6, 6, 14, 12, 13, 5, 14, 13, 13, 7, 5),
+    (15, 5, 8, 11, 14, 14, 6, 14, 6, 9, 12, 9, 12, 5, 15, 8),
+    (8, 5, 12, 9, 12, 5, 14, 6, 8, 13, 6, 5, 15, 13, 11, 11),
+)))
+
+_KL = (0x00000000, 0x5a827999, 0x6ed9eba1, 0x8f1bbcdc, 0xa953fd4e)
+_KR = (0x50a28be6, 0x5c4dd124, 0x6d703ef3, 0x7a6d76e9, 0x00000000)
+
+
+def _line(x, state, steps, k, functions):
+    """
+    Run one line of the compression function. The boolean function of
+    each round is inlined in its own loop rather than called per step.
+    """
+    a, b, c, d, e = state
+    m = _MASK
+    for round_, f in enumerate(functions):
+        kr = k[round_]
+        if f == 1:
+            for r, s in steps[round_]:
+                t = (a + (b ^ c ^ d) + x[r] + kr) & m
+                a, e, d, c = e, d, ((c << 10) | (c >> 22)) & m, b
+                b = ((((t << s) | (t >> (32 - s))) & m) + a) & m
+        elif f == 2:
+            for r, s in steps[round_]:
+                t = (a + ((b & c) | (~b & d)) + x[r] + kr) & m
+                a, e, d, c = e, d, ((c << 10) | (c >> 22)) & m, b
+                b = ((((t << s) | (t >> (32 - s))) & m) + a) & m
+        elif f == 3:
+            for r, s in steps[round_]:
+                t = (a + ((b | (c ^ m)) ^ d) + x[r] + kr) & m
+                a, e, d, c = e, d, ((c << 10) | (c >> 22)) & m, b
+                b = ((((t << s) | (t >> (32 - s))) & m) + a) & m
+        elif f == 4:
+            for r, s in steps[round_]:
+                t = (a + ((b & d) | (c & ~d)) + x[r] + kr) & m
+                a, e, d, c = e, d, ((c << 10) | (c >> 22)) & m, b
+                b = ((((t << s) | (t >> (32 - s))) & m) + a) & m
+        else:
+            for r, s in steps[round_]:
+                t = (a + (b ^ (c | (d ^ m))) + x[r] + kr) & m
+                a, e, d, c = e, d, ((c << 10) | (c >> 22)) & m, b
+                b = ((((t << s) | (t >> (32 - s))) & m) + a) & m
+    return a, b, c, d, e
+
+
+def _compress(state, block):
+    x = _WORDS.unpack(block)
+    al, bl, cl, dl, el = _line(x, state, _LEFT, _KL, (1, 2, 3, 4, 5))
+    ar, br, cr, dr, er = _line(x, state, _RIGHT, _KR, (5, 4, 3, 2, 1))
+    h0, h1, h2, h3, h4 = state
+    return (
+        (h1 + cl + dr) & _MASK,
+        (h2 + dl + er) & _MASK,
+        (h3 + el + ar) & _MASK,
+        (h4 + al + br) & _MASK,
+        (h0 + bl + cr) & _MASK,
+    )
+
+
+def ripemd160_python(data):
+    """
+    RIPEMD-160 digest of data in pure Python.
+    """
+    data = bytes(data)
+    length = len(data)
+    padding = b'\x80' + b'\x00' * ((55 - length) % 64)
+    data += padding + struct.pack('<Q', (length * 8) & 0xffffffffffffffff)
+    state = _INITIAL_STATE
+    for i in range(0, len(data), 64):
+        state = _compress(state, data[i:i + 64])
+    return _DIGEST.pack(*state)
+
+
+def ripemd160_openssl(data):
+    return hashlib.new('ripemd160', data).digest()
+
+
+def _openssl_available():
+    try:
+        hashlib.new('ripemd160')
+    except ValueError:
+        return False
+    return True
+
+
+NAME = 'python'
+ripemd160 = ripemd160_python
+
+
+def available():
+    """
+    Returns the names of the RIPEMD-160 backends that can be used here.
+    """
+    if _openssl_available():
+        return ['openssl', 'python']
+    return ['python']
+
+
+def use(name):
+    """
+    Switch to the 'openssl' or 'python' RIPEMD-160 backend.
+    """
+    global NAME, ripemd160
+    if name not in available():
+        raise ValueError(f'Backend {name} is not available.')
+    NAME = name
+    ripemd160 = ripemd160_openssl if name == 'openssl' else ripemd160_python
+
+
+use(available()[0])
@@ -0,0 +1,268 @@
+import hashlib
+import hmac
+
+from .ecc import N, PrivateKey, S256Point, generator_multiples
+from .helpers import (
+    LRUCache, decode_base58_checksum, encode_base58_checksum, hash160,
+)
+
+
+HARDENED = 0x80000000
+
+XPRV_MAINNET = bytes.fromhex('0488ade4')
+XPUB_MAINNET = bytes.fromhex('0488b21e')
+XPRV_TESTNET = bytes.fromhex('04358394')
+XPUB_TESTNET = bytes.fromhex('043587cf')
+
+# Child points and chain codes from public derivation, keyed on (parent
+# public key, parent chain code, index), so siblings and repeated paths
+# reuse the nodes above them. Only public data is kept: private children
+# are cheap to derive once their parent's point is known.
+node_cache = LRUCache(maxsize=10000)
+
+
+def parse_path(path):
+    """
+    Turn a path like "m/44'/0'/0'/0" (or "m/44h/0h") into a list of child
+    indexes. A list of ints is returned as is.
+    """
+    if not isinstance(path, str):
+        return list(path)
+    parts = path.split('/')
+    if parts[0] in ('m', 'M'):
+        parts = parts[1:]
+    indexes = []
+    for part in parts:
+        if not part:
+            continue
+        if part[-1] in "'hH":
+            indexes.append(int(part[:-1]) + HARDENED)
+        else:
+            indexes.append(int(part))
+    return indexes
+
+
+def _child_tweak(chain_code, data, index):
+    i = hmac.new(chain_code, data + index.to_bytes(4, 'big'),
+                 hashlib.sha512).digest()
+    tweak = int.from_bytes(i[:32], 'big')
+    if tweak >= N:
+        raise ValueError(f'Invalid child {index}, use the next index.')
+    return tweak, i[32:]
+
+
+class ExtendedKey(object):
+    """
+    Fields shared by extended private and public keys.
+    """
+
+    def __init__(self, chain_code, depth=0, parent_fingerprint=b'\x00' * 4,
+                 child_number=0, testnet=False):
+        self.chain_code = chain_code
+        self.depth = depth
+        self.parent_fingerprint = parent_fingerprint
+        self.child_number = child_number
+        self.testnet = testnet
+
+    def __str__(self):
+        return self.serialize()
+
+    def __eq__(self, other):
+        return self.serialize() == other.serialize()
+
+    def fingerprint(self):
+        return hash160(self.point.sec())[:4]
+
+    def address(self, compressed=True):
+        return self.point.address(compressed=compressed, testnet=self.testnet)
+
+    def _fields(self, index):
+        """
+        Metadata of the child at `index`.
+        """
+        return {
+            'depth': self.depth + 1,
+            'parent_fingerprint': self.fingerprint(),
+            'child_number': index,
+            'testnet': self.testnet,
+        }
+
+    def _key_data(self):
+        raise NotImplementedError
+
+    def _derive_child(self, index):
+        raise NotImplementedError
+
+    def child(self, index):
+        return self._derive_child(index)
+
+    def derive(self, path):
+        node = self
+        for index in parse_path(path):
+            node = node.child(index)
+        return node
+
+    def _serialize(self, version):
+        return encode_base58_checksum(
+            version
+            + bytes([self.depth])
+            + self.parent_fingerprint
+            + self.child_number.to_bytes(4, 'big')
+            + self.chain_code
+            + self._key_data()
+        )
+
+    @staticmethod
+    def parse(s):
+        """
+        Parse an xprv/xpub (or tprv/tpub) string into an extended key.
+        """
+        raw = decode_base58_checksum(s)
+        if len(raw) != 78:
+            raise ValueError(f'Bad extended key length: {len(raw)}')
+        version = raw[:4]
+        fields = {
+            'depth': raw[4],
+            'parent_fingerprint': raw[5:9],
+            'child_number': int.from_bytes(raw[9:13], 'big'),
+            'testnet': version in (XPRV_TESTNET, XPUB_TESTNET),
+        }
+        chain_code, key = raw[13:45], raw[45:]
+        if version in (XPRV_MAINNET, XPRV_TESTNET):
+            if key[0] != 0:
+                raise ValueError('Bad private key data.')
+            secret = int.from_bytes(key[1:], 'big')
+            return ExtendedPrivateKey(secret, chain_code, **fields)
+        if version in (XPUB_MAINNET, XPUB_TESTNET):
+            return ExtendedPublicKey(S256Point.parse(key), chain_code, **fields)
+        raise ValueError(f'Unknown extended key version: {version.hex()}')
+
+
+class ExtendedPublicKey(ExtendedKey):
+    def __init__(self, point, chain_code, **kwargs):
+        super().__init__(chain_code, **kwargs)
+        self.point = point
+
+    def _key_data(self):
+        return self.point.sec()
+
+    def _derive_child(self, index):
+        """
+        Returns the child at `index`, its point and chain code taken from
+        node_cache when possible.
+        """
+        if index >= HARDENED:
+            raise ValueError('Cannot derive a hardened child from a public key.')
+        key = (self._key_data(), self.chain_code, index)
+        cached = node_cache.get(key)
+        if cached is None:
+            tweak, chain_code = _child_tweak(self.chain_code, key[0], index)
+            (x, y), = generator_multiples([tweak], self.point)
+            if x is None:
+                raise ValueError(f'Invalid child {index}, use the next index.')
+            cached = (S256Point._new(x, y), chain_code)
+            node_cache.put(key, cached)
+        point, chain_code = cached
+        return ExtendedPublicKey(point, chain_code, **self._fields(index))
+
+    def derive_range(self, path, start, count):
+        """
+        Returns the `count` children following `start` of the node at
+        `path`. The child points share a single inversion.
+        """
+        parent = self.derive(path)
+        data = parent._key_data()
+        chain_codes, tweaks = [], []
+        for index in range(start, start + count):
+            if index >= HARDENED:
+                raise ValueError('Cannot derive a hardened child from a public key.')
+            tweak, chain_code = _child_tweak(parent.chain_code, data, index)
+            chain_codes.append(chain_code)
+            tweaks.append(tweak)
+        points = generator_multiples(tweaks, parent.point)
+        fields = parent._fields(start)
+        children = []
+        for index, chain_code, (x, y) in zip(
+                range(start, start + count), chain_codes, points):
+            if x is None:
+                raise ValueError(f'Invalid child {index}, use the next index.')
+            fields['child_number'] = index
+            children.append(ExtendedPublicKey(
+                S256Point._new(x, y), chain_code, **fields))
+        return children
+
+    def serialize(self):
+        return self._serialize(XPUB_TESTNET if self.testnet else XPUB_MAINNET)
+
+
+class ExtendedPrivateKey(ExtendedKey):
+    def __init__(self, secret, chain_code, point=None, **kwargs):
+        super().__init__(chain_code, **kwargs)
+        if not 0 < secret < N:
+            raise ValueError('Secret out of range.')
+        self.secret = secret
+        self._point = point
+
+    @staticmethod
+    def from_seed(seed, testnet=False):
+        i = hmac.new(b'Bitcoin seed', seed, hashlib.sha512).digest()
+        return ExtendedPrivateKey(int.from_bytes(i[:32], 'big'), i[32:],
+                                  testnet=testnet)
+
+    @property
+    def point(self):
+        if self._point is None:
+            self._point = S256Point._new(*generator_multiples([self.secret])[0])
+        return self._point
+
+    @property
+    def private_key(self):
+        return PrivateKey(self.secret)
+
+    def public_key(self):
+        return ExtendedPublicKey(
+            self.point, self.chain_code, depth=self.depth,
+            parent_fingerprint=self.parent_fingerprint,
+            child_number=self.child_number, testnet=self.testnet,
+        )
+
+    def _key_data(self):
+        return b'\x00' + self.secret.to_bytes(32, 'big')
+
+    def _tweak(self, index):
+        if index >= HARDENED:
+            data = self._key_data()
+        else:
+            data = self.point.sec()
+        return _child_tweak(self.chain_code, data, index)
+
+    def _derive_child(self, index):
+        tweak, chain_code = self._tweak(index)
+        secret = (tweak + self.secret) % N
+        if not secret:
+            raise ValueError(f'Invalid child {index}, use the next index.')
+        return ExtendedPrivateKey(secret, chain_code, **self._fields(index))
+
+    def derive_range(self, path, start, count):
+        """
+        Returns the `count` children following `start` of the node at
+        `path`, with their public points computed from the fixed-base table
+        and normalized with a single inversion.
+        """
+        parent = self.derive(path)
+        fields = parent._fields(start)
+        children = []
+        for index in range(start, start + count):
+            tweak, chain_code = parent._tweak(index)
+            secret = (tweak + parent.secret) % N
+            if not secret:
+                raise ValueError(f'Invalid child {index}, use the next index.')
+            fields['child_number'] = index
+            children.append(ExtendedPrivateKey(secret, chain_code, **fields))
+        points = generator_multiples([c.secret for c in children])
+        for child, (x, y) in zip(children, points):
+            child._point = S256Point._new(x, y)
+        return children
+
+    def serialize(self):
+        return self._serialize(XPRV_TESTNET if self.testnet else XPRV_MAINNET)
@@ -1,51 +1,445 @@
 import hashlib 
+import struct
+import threading
+from collections import OrderedDict
+
+from . import backend, hashes
 
 
 BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
 
+# Maps every ASCII byte to its base58 digit, or to 0xff when it is not in
+# the alphabet, for use with bytes.translate.
+_BASE58_DIGITS = bytes(
+    BASE58_ALPHABET.index(chr(b)) if chr(b) in BASE58_ALPHABET else 0xff
+    for b in range(256)
+)
+
+# The big number is converted 10 digits at a time. 58^10 still fits in a
+# machine word, so only one big division or multiplication is done per
+# chunk and the digits inside a chunk use small integer arithmetic.
+_BASE58_CHUNK_DIGITS = 10
+_BASE58_CHUNK = 58**_BASE58_CHUNK_DIGITS
+
+# Inputs over 1 KiB are split in halves on powers 58^(10 * 2^i) instead, so
+# the big number work is a few balanced divisions or multiplications rather
+# than one pass per chunk. With gmpy2 this makes the conversion close to
+# linear time; with Python ints it is still quadratic, with a smaller
+# constant.
+_BASE58_SPLIT_BYTES = 1024
+_BASE58_SPLIT_DIGITS = 1400
+
+
+def _base58_powers(count):
+    """
+    Returns [58^10, 58^20, 58^40, ...], count entries as backend numbers.
+    """
+    powers = [backend.mpz(_BASE58_CHUNK)]
+    while len(powers) < count:
+        powers.append(powers[-1] * powers[-1])
+    return powers
+
+
+def _encode_base58_split(num, powers, level, digits):
+    """
+    Append the 10 * 2^(level + 1) base58 digits of num to digits, least
+    significant first.
+    """
+    if level < 0:
+        chunk = int(num)
+        for _ in range(_BASE58_CHUNK_DIGITS):
+            chunk, mod = divmod(chunk, 58)
+            digits.append(BASE58_ALPHABET[mod])
+        return
+    high, low = divmod(num, powers[level])
+    _encode_base58_split(low, powers, level - 1, digits)
+    _encode_base58_split(high, powers, level - 1, digits)
+
 
 def encode_base58(s):
-    count = 0
-    for c in s:
-        if c == 0:
-            count += 1
-        else:
-            break
+    count = len(s) - len(bytes(s).lstrip(b'\x00'))
     num = int.from_bytes(s, 'big')
-    prefix = '1' * count
-    result = ''
-    while num > 0:
-        num, mod = divmod(num, 58)
-        result = BASE58_ALPHABET[mod] + result
-    return prefix + result
+    digits = []
+    if len(s) > _BASE58_SPLIT_BYTES:
+        num = backend.mpz(num)
+        powers = _base58_powers(1)
+        while powers[-1] <= num:
+            powers.append(powers[-1] * powers[-1])
+        _encode_base58_split(num, powers, len(powers) - 2, digits)
+    else:
+        while num > 0:
+            num, chunk = divmod(num, _BASE58_CHUNK)
+            for _ in range(_BASE58_CHUNK_DIGITS):
+                chunk, mod = divmod(chunk, 58)
+                digits.append(BASE58_ALPHABET[mod])
+    result = ''.join(reversed(digits)).lstrip('1')
+    return '1' * count + result
 
 
 def encode_base58_checksum(s):
     return encode_base58(s + hash256(s)[:4])
 
 
-def decode_base58(s):
+def _decode_base58_raw(s):
+    """
+    Decode a base58 string of any length into bytes, leading zeros kept.
+    """
+    digits = s.encode('ascii').translate(_BASE58_DIGITS)
+    if b'\xff' in digits:
+        raise ValueError(f'Invalid base58 string: {s}')
+    count = len(digits) - len(digits.lstrip(b'\x00'))
+    if len(digits) > _BASE58_SPLIT_DIGITS:
+        level = 0
+        while _BASE58_CHUNK_DIGITS << (level + 1) < len(digits):
+            level += 1
+        num = int(_decode_base58_split(
+            digits, _base58_powers(level + 1), level))
+        return b'\x00' * count + num.to_bytes((num.bit_length() + 7) // 8, 'big')
     num = 0
-    for c in s:
-        num *= 58
-        num += BASE58_ALPHABET.index(c)
-    combined = num.to_bytes(25, byteorder='big')
-    checksum = combined[-4:]
-    if hash256(combined[:-4])[:4] != checksum:
+    pos = 0
+    size = len(digits) % _BASE58_CHUNK_DIGITS or _BASE58_CHUNK_DIGITS
+    while pos < len(digits):
+        chunk = 0
+        for d in digits[pos:pos + size]:
+            chunk = chunk * 58 + d
+        num = num * 58**size + chunk
+        pos += size
+        size = _BASE58_CHUNK_DIGITS
+    return b'\x00' * count + num.to_bytes((num.bit_length() + 7) // 8, 'big')
+
+
+def _decode_base58_split(digits, powers, level):
+    """
+    The number written by at most 10 * 2^(level + 1) base58 digit values.
+    """
+    if level < 0:
+        num = 0
+        for d in digits:
+            num = num * 58 + d
+        return num
+    size = _BASE58_CHUNK_DIGITS << level
+    if len(digits) <= size:
+        return _decode_base58_split(digits, powers, level - 1)
+    high = _decode_base58_split(digits[:-size], powers, level - 1)
+    low = _decode_base58_split(digits[-size:], powers, level - 1)
+    return high * powers[level] + low
+
+
+def decode_base58(s):
+    """
+    Decode a Base58Check string and return the payload without its version
+    byte and checksum, e.g. the hash160 of an address.
+    """
+    try:
+        return decode_base58_checksum(s)[1:]
+    except ValueError:
         raise ValueError(f'Bad address: {s}')
-    return combined[1:-4]
+
+
+def decode_base58_checksum(s):
+    """
+    Decode a Base58Check string of any length, e.g. a WIF or an extended
+    key, and return the payload without its checksum.
+    """
+    combined = _decode_base58_raw(s)
+    payload, checksum = combined[:-4], combined[-4:]
+    if len(combined) < 5 or hash256(payload)[:4] != checksum:
+        raise ValueError(f'Bad checksum: {s}')
+    return payload
+
+
+def encode_base58_checksum_many(payloads):
+    """
+    Base58Check encode every payload in a sequence.
+    """
+    return [encode_base58_checksum(payload) for payload in payloads]
+
+
+def decode_base58_checksum_many(strings):
+    """
+    Decode a sequence of Base58Check strings, e.g. addresses to validate.
+    Returns the payloads without their checksums, with None in place of
+    the strings that are invalid.
+    """
+    decode = decode_base58_checksum
+    results = []
+    for s in strings:
+        try:
+            results.append(decode(s))
+        except ValueError:
+            results.append(None)
+    return results
+
+
+class LRUCache(object):
+    """
+    A bounded, thread-safe mapping that evicts the least recently used
+    entry first and keeps hit/miss/eviction counters. A maxsize of 0
+    disables it.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if self.maxsize <= 0:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def _evict(self):
+        while len(self._data) > max(self.maxsize, 0):
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def info(self):
+        """
+        Returns a dict with the counters, current size and maxsize.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
+
+
+BECH32_ALPHABET = 'qpzry9x8gf2tvdw0s3jn54khce6mua7l'
+
+# Checksum constants of BIP173 (bech32) and BIP350 (bech32m).
+BECH32_CONST = 1
+BECH32M_CONST = 0x2bc830a3
+
+_BECH32_DIGITS = bytes(
+    BECH32_ALPHABET.index(chr(b)) if chr(b) in BECH32_ALPHABET else 0xff
+    for b in range(256)
+)
+
+_BECH32_GENERATOR = (0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3)
+
+
+def _bech32_table_entry(top):
+    chk = 0
+    for i in range(5):
+        if (top >> i) & 1:
+            chk ^= _BECH32_GENERATOR[i]
+    return chk
+
+
+# XOR of the generator terms selected by each value of the 5 bits shifted
+# out of the checksum, so every step of the polymod is a single lookup.
+_BECH32_TABLE = tuple(_bech32_table_entry(top) for top in range(32))
+
+
+def _bech32_polymod(values, chk=1):
+    table = _BECH32_TABLE
+    for v in values:
+        chk = ((chk & 0x1ffffff) << 5) ^ v ^ table[chk >> 25]
+    return chk
+
+
+# Checksum state after the expanded human readable part, which is the same
+# for every address of a network.
+_BECH32_HRP_STATES = LRUCache(maxsize=64)
+
+
+def _bech32_hrp_state(hrp):
+    state = _BECH32_HRP_STATES.get(hrp)
+    if state is None:
+        expanded = [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+        state = _bech32_polymod(expanded)
+        _BECH32_HRP_STATES.put(hrp, state)
+    return state
+
+
+def encode_bech32(hrp, data, bech32m=False):
+    """
+    Encode a human readable part and a sequence of 5 bit values.
+    """
+    const = BECH32M_CONST if bech32m else BECH32_CONST
+    chk = _bech32_polymod(data, _bech32_hrp_state(hrp))
+    chk = _bech32_polymod(bytes(6), chk) ^ const
+    checksum = [(chk >> 5 * (5 - i)) & 31 for i in range(6)]
+    return hrp + '1' + ''.join(BECH32_ALPHABET[d] for d in list(data) + checksum)
+
+
+def decode_bech32(s):
+    """
+    Decode a bech32 or bech32m string. Returns the human readable part, the
+    5 bit values without the checksum and whether it was bech32m.
+    """
+    if len(s) > 90:
+        raise ValueError(f'Bech32 string too long: {s}')
+    lower = s.lower()
+    if s != lower and s != s.upper():
+        raise ValueError(f'Mixed case bech32 string: {s}')
+    pos = lower.rfind('1')
+    if pos < 1 or pos + 7 > len(lower):
+        raise ValueError(f'Bad bech32 separator position: {s}')
+    hrp = lower[:pos]
+    for c in hrp:
+        if not 33 <= ord(c) <= 126:
+            raise ValueError(f'Bad bech32 human readable part: {s}')
+    digits = lower[pos + 1:].encode('ascii').translate(_BECH32_DIGITS)
+    if b'\xff' in digits:
+        raise ValueError(f'Invalid bech32 character: {s}')
+    const = _bech32_polymod(digits, _bech32_hrp_state(hrp))
+    if const == BECH32_CONST:
+        bech32m = False
+    elif const == BECH32M_CONST:
+        bech32m = True
+    else:
+        raise ValueError(f'Bad bech32 checksum: {s}')
+    return hrp, digits[:-6], bech32m
+
+
+def convert_bits(data, from_bits, to_bits, pad=True):
+    """
+    Regroup a sequence of from_bits wide values into to_bits wide values.
+    """
+    acc = 0
+    bits = 0
+    result = []
+    mask = (1 << to_bits) - 1
+    for value in data:
+        if value >> from_bits:
+            raise ValueError(f'Value out of range: {value}')
+        acc = (acc << from_bits) | value
+        bits += from_bits
+        while bits >= to_bits:
+            bits -= to_bits
+            result.append((acc >> bits) & mask)
+    if pad:
+        if bits:
+            result.append((acc << (to_bits - bits)) & mask)
+    elif bits >= from_bits or (acc << (to_bits - bits)) & mask:
+        raise ValueError('Invalid padding.')
+    return result
+
+
+def _check_witness_program(version, program):
+    if not 0 <= version <= 16:
+        raise ValueError(f'Invalid witness version: {version}')
+    if not 2 <= len(program) <= 40:
+        raise ValueError(f'Invalid witness program length: {len(program)}')
+    if version == 0 and len(program) not in (20, 32):
+        raise ValueError(f'Invalid witness v0 program length: {len(program)}')
+
+
+def encode_segwit_address(version, program, testnet=False):
+    """
+    Return the bech32 (version 0) or bech32m (version 1 and up) address of
+    a witness program.
+    """
+    _check_witness_program(version, program)
+    hrp = 'tb' if testnet else 'bc'
+    data = [version] + convert_bits(program, 8, 5)
+    return encode_bech32(hrp, data, bech32m=version > 0)
+
+
+def decode_segwit_address(address, testnet=False):
+    """
+    Decode a native segwit address into its witness version and program.
+    """
+    hrp, data, bech32m = decode_bech32(address)
+    if hrp != ('tb' if testnet else 'bc'):
+        raise ValueError(f'Wrong network for address: {address}')
+    if not data:
+        raise ValueError(f'Empty segwit address: {address}')
+    version = data[0]
+    program = bytes(convert_bits(data[1:], 5, 8, pad=False))
+    _check_witness_program(version, program)
+    if bech32m != (version > 0):
+        raise ValueError(f'Wrong checksum variant for address: {address}')
+    return version, program
+
+
+def decode_segwit_address_many(addresses, testnet=False):
+    """
+    Decode a sequence of segwit addresses, e.g. a payout file to validate.
+    Returns (version, program) tuples, with None in place of the addresses
+    that are invalid.
+    """
+    decode = decode_segwit_address
+    results = []
+    for address in addresses:
+        try:
+            results.append(decode(address, testnet))
+        except ValueError:
+            results.append(None)
+    return results
 
 
 def hash256(b):
     return hashlib.sha256(hashlib.sha256(b).digest()).digest()
 
 
-def hash160(s):
-    return hashlib.new('ripemd160', hashlib.sha256(s).digest()).digest()
+# SHA256 states that have already absorbed sha256(tag) || sha256(tag), one
+# full block, so tagged hashes only hash the message itself.
+_TAG_MIDSTATES = {}
+
 
+def tagged_hash(tag, msg):
+    """
+    BIP340 tagged hash: sha256(sha256(tag) || sha256(tag) || msg).
+    """
+    midstate = _TAG_MIDSTATES.get(tag)
+    if midstate is None:
+        tag_hash = hashlib.sha256(tag.encode('utf-8')).digest()
+        midstate = hashlib.sha256(tag_hash + tag_hash)
+        _TAG_MIDSTATES[tag] = midstate
+    h = midstate.copy()
+    h.update(msg)
+    return h.digest()
 
-def encode_base58_checksum(b):
-    return encode_base58(b + hash256(b)[:4])
+
+def ripemd160(b):
+    return hashes.ripemd160(b)
+
+
+def hash160(s):
+    return hashes.ripemd160(hashlib.sha256(s).digest())
 
 
 def little_endian_to_int(b):
@@ -56,10 +450,120 @@ def int_to_little_endian(n, num_bytes):
     return n.to_bytes(num_bytes, 'little')
 
 
+_U8 = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+_U64 = struct.Struct('<Q')
+
+
+class Reader(object):
+    """
+    A position cursor over bytes, a memoryview or an mmap.
+
+    Fixed width integers are unpacked in place and slice() hands out
+    memoryviews, so no intermediate bytes objects are created. Reader also
+    has the read(n) method of a stream, which returns bytes, and can be
+    passed to every parse method that takes a stream.
+
+    Views into an mmap keep it open; drop them before closing the map.
+    """
+
+    __slots__ = ('buf', 'pos', '_bytes')
+
+    def __init__(self, buf, pos=0):
+        # read() slices bytes directly, which is cheaper than a view
+        # followed by tobytes().
+        self._bytes = buf if buf.__class__ is bytes else None
+        self.buf = buf if isinstance(buf, memoryview) else memoryview(buf)
+        self.pos = pos
+
+    def __len__(self):
+        """
+        Number of bytes left to read.
+        """
+        return len(self.buf) - self.pos
+
+    def _unpack(self, fmt):
+        try:
+            value, = fmt.unpack_from(self.buf, self.pos)
+        except struct.error:
+            raise ValueError('Unexpected end of data.')
+        self.pos += fmt.size
+        return value
+
+    def u8(self):
+        return self._unpack(_U8)
+
+    def u16(self):
+        return self._unpack(_U16)
+
+    # u32 and u64 are what transactions are made of, so they are unpacked
+    # inline rather than through _unpack.
+    def u32(self):
+        pos = self.pos
+        try:
+            value, = _U32.unpack_from(self.buf, pos)
+        except struct.error:
+            raise ValueError('Unexpected end of data.')
+        self.pos = pos + 4
+        return value
+
+    def u64(self):
+        pos = self.pos
+        try:
+            value, = _U64.unpack_from(self.buf, pos)
+        except struct.error:
+            raise ValueError('Unexpected end of data.')
+        self.pos = pos + 8
+        return value
+
+    def varint(self):
+        pos = self.pos
+        try:
+            i = self.buf[pos]
+        except IndexError:
+            raise ValueError('Unexpected end of data.')
+        self.pos = pos + 1
+        if i < 0xfd:
+            return i
+        elif i == 0xfd:
+            return self._unpack(_U16)
+        elif i == 0xfe:
+            return self._unpack(_U32)
+        else:
+            return self._unpack(_U64)
+
+    def slice(self, n):
+        """
+        Returns a view of the next n bytes without copying them.
+        """
+        end = self.pos + n
+        if end > len(self.buf):
+            raise ValueError('Unexpected end of data.')
+        view = self.buf[self.pos:end]
+        self.pos = end
+        return view
+
+    def read(self, n=-1):
+        """
+        Returns up to n bytes (all that is left by default), like the read
+        method of a stream.
+        """
+        end = len(self.buf) if n < 0 else min(self.pos + n, len(self.buf))
+        if self._bytes is not None:
+            data = self._bytes[self.pos:end]
+        else:
+            data = self.buf[self.pos:end].tobytes()
+        self.pos = end
+        return data
+
+
 def read_varints(stream):
     """
     Reads a variable integer from a stream.
     """
+    if isinstance(stream, Reader):
+        return stream.varint()
     i = stream.read(1)[0]
     if i == 0xfd:
         return little_endian_to_int(stream.read(2))
@@ -71,6 +575,24 @@ def read_varints(stream):
         return i
 
 
+def read_u32(stream):
+    """
+    Reads a 4 byte little endian integer from a stream or a Reader.
+    """
+    if stream.__class__ is Reader:
+        return stream.u32()
+    return little_endian_to_int(stream.read(4))
+
+
+def read_u64(stream):
+    """
+    Reads an 8 byte little endian integer from a stream or a Reader.
+    """
+    if stream.__class__ is Reader:
+        return stream.u64()
+    return little_endian_to_int(stream.read(8))
+
+
 def encode_varints(i):
     """
     Encodes an integer as a varint.
@@ -87,39 +609,55 @@ def encode_varints(i):
         raise ValueError(f'Integer too large: {i}')
 
 
-def encode_num(num):
-    if num == 0:
-        return b''
-    abs_num = abs(num)
+def _encode_num(num):
     negative = num < 0
-    result = bytearray()
-    while abs_num:
-        result.append(abs_num & 0xff)
-        abs_num >>= 8
-    if result[-1] & 0x80:
-        if negative:
-            result.append(0x80)
-        else:
-            result.append(0)
-    elif negative:
-        result[-1] = result[-1] | 0x80
-    return bytes(result)
+    abs_num = -num if negative else num
+    # One more bit than the magnitude needs, for the sign.
+    length = (abs_num.bit_length() + 8) // 8
+    if negative:
+        abs_num |= 1 << (8 * length - 1)
+    return abs_num.to_bytes(length, 'little')
+
+
+# Encodings of -1 to 16, the numbers OP_1NEGATE and OP_0 to OP_16 push and
+# that most arithmetic and comparisons produce.
+_SMALL_NUMS = {n: _encode_num(n) if n else b'' for n in range(-1, 17)}
+_SMALL_NUM_VALUES = {encoded: n for n, encoded in _SMALL_NUMS.items()}
+
+
+def encode_num(num):
+    """
+    Encode an integer as a script number: little endian, as short as
+    possible, with the sign in the top bit of the last byte.
+    """
+    encoded = _SMALL_NUMS.get(num)
+    if encoded is not None:
+        return encoded
+    return _encode_num(num)
 
 
 def decode_num(element):
-    if element == b'':
+    # Only bytes can be looked up; a bytearray is not hashable.
+    if element.__class__ is bytes:
+        value = _SMALL_NUM_VALUES.get(element)
+        if value is not None:
+            return value
+    if not element:
         return 0
-    big_endian = element[::-1]
-    if big_endian[0] & 0x80:
-        negative = True
-        result = big_endian[0] & 0x7f
-    else:
-        negative = False
-        result = big_endian[0]
-    for c in big_endian[1:]:
-        result <<= 8
-        result += c
-    if negative:
-        return -result
-    else:
-        return result
+    result = int.from_bytes(element, 'little')
+    sign = 1 << (8 * len(element) - 1)
+    if result & sign:
+        return -(result ^ sign)
+    return result
+
+
+def cast_to_bool(element):
+    """
+    Script truthiness without decoding the number: false for the empty
+    element and for any run of zero bytes, including negative zero.
+    """
+    if not element:
+        return False
+    if element[-1] & 0x7f:
+        return True
+    return any(element[:-1])
@@ -0,0 +1,107 @@
+"""
+Bitcoin signed messages, as produced by `signmessage` in Bitcoin Core.
+
+The signature is 65 bytes, base64 encoded: a header byte of 27 plus the
+recovery id (plus 4 when the key is compressed), then r and s. The public
+key is recovered from the signature and compared to the P2PKH address.
+"""
+import base64
+import binascii
+import hashlib
+import multiprocessing
+import os
+
+from .ecc import S256Point, Signature, precompute_generator_table
+from .exceptions import BadSignature
+from .helpers import decode_base58_checksum, encode_varints, hash160
+
+
+MESSAGE_MAGIC = b'\x18Bitcoin Signed Message:\n'
+
+# SHA256 state that has already absorbed the magic prefix.
+_MAGIC_MIDSTATE = hashlib.sha256(MESSAGE_MAGIC)
+
+
+def message_hash(message):
+    """
+    Returns the double SHA256 of the prefixed message, as an integer.
+    """
+    if isinstance(message, str):
+        message = message.encode('utf-8')
+    h = _MAGIC_MIDSTATE.copy()
+    h.update(encode_varints(len(message)))
+    h.update(message)
+    return int.from_bytes(hashlib.sha256(h.digest()).digest(), 'big')
+
+
+def sign_message(private_key, message, compressed=True):
+    """
+    Sign message with private_key and return the base64 signature.
+    """
+    signature, recid = private_key.sign_recoverable(message_hash(message))
+    header = 27 + recid + (4 if compressed else 0)
+    return base64.b64encode(
+        bytes([header])
+        + signature.r.to_bytes(32, 'big')
+        + signature.s.to_bytes(32, 'big')
+    ).decode('ascii')
+
+
+def recover_message_key(signature, message):
+    """
+    Returns the public key that signed message and whether it was
+    compressed. Raises BadSignature if none can be recovered.
+    """
+    try:
+        raw = base64.b64decode(signature, validate=True)
+    except (binascii.Error, ValueError):
+        raise BadSignature
+    if len(raw) != 65 or not 27 <= raw[0] <= 34:
+        raise BadSignature
+    recid = (raw[0] - 27) & 3
+    compressed = raw[0] >= 31
+    sig = Signature(int.from_bytes(raw[1:33], 'big'),
+                    int.from_bytes(raw[33:], 'big'))
+    point = S256Point.recover(message_hash(message), sig, recid)
+    return point, compressed
+
+
+def verify_message(address, signature, message):
+    """
+    Check a signed message against a P2PKH address.
+    """
+    try:
+        payload = decode_base58_checksum(address)
+        point, compressed = recover_message_key(signature, message)
+    except (BadSignature, ValueError):
+        return False
+    # Only P2PKH addresses: a P2SH address with the same hash160 is not
+    # controlled by the key that signed.
+    if len(payload) != 21 or payload[0] not in (0x00, 0x6f):
+        return False
+    return hash160(point.sec(compressed)) == payload[1:]
+
+
+def _verify_chunk(items):
+    return [verify_message(*item) for item in items]
+
+
+def verify_messages(items, processes=None, chunk_size=256):
+    """
+    Verify many (address, signature, message) triples and return a list of
+    bools.
+
+    The work is split in chunks of `chunk_size` over a pool of `processes`
+    workers (all CPUs by default, 0 to stay in this process). The
+    generator table is built before the pool starts so the workers share
+    it instead of building their own.
+    """
+    items = list(items)
+    precompute_generator_table()
+    if processes == 0 or len(items) <= chunk_size:
+        return _verify_chunk(items)
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    processes = processes or os.cpu_count() or 1
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(_verify_chunk, chunks)
+    return [valid for chunk in results for valid in chunk]
@@ -5,7 +5,7 @@ from .exceptions import (
     BadOpCode, InvalidTransaction, ScriptError, StackError
 )
 from .helpers import (
-    decode_num, encode_num, hash160, hash256 
+    cast_to_bool, decode_num, encode_num, hash160, hash256, ripemd160,
 )
 
 
@@ -291,7 +291,7 @@ def op_if(stackval=True, **kwargs):
         raise ScriptError
 
     element = stack.pop()
-    if decode_num(element) == 0:
+    if not cast_to_bool(element):
         commands[:0] = else_block if stackval else if_block
     else:
         commands[:0] = if_block if stackval else else_block
@@ -313,7 +313,7 @@ def op_verify(**kwargs):
     if len(stack) < 1:
         raise StackError
     element = stack.pop()
-    if decode_num(element) == 0:
+    if not cast_to_bool(element):
         raise InvalidTransaction
 
 
@@ -957,7 +957,7 @@ def op_ripemd160(**kwargs):
     if len(stack) < 1:
         raise StackError
     a = stack.pop()
-    b = hashlib.new('ripemd160', a).digest()
+    b = ripemd160(a)
     stack.append(b)
 
 
@@ -1025,11 +1025,11 @@ def op_checksig(**kwargs):
     sec_bin = stack.pop()
 
     # The next element of the stack is the DER signature
-    # Take off the last byte of the signature as that's the hash_type
-    sig_bin = stack.pop()[:-1]
+    # Leave out the last byte of the signature as that's the hash_type
+    sig_bin = stack.pop()
 
     # Parse the serialized pubkey and signature into objects
-    signature = Signature.parse(sig_bin)
+    signature = Signature.parse(sig_bin, 0, len(sig_bin) - 1)
     pubkey = S256Point.parse(sec_bin)
 
     # Verify the signature using S256Point.verify()
@@ -2,8 +2,8 @@ from .exceptions import (
     InvalidTransaction, ScriptError,
 )
 from .helpers import (
-    encode_varints, int_to_little_endian, little_endian_to_int, 
-    read_varints
+    cast_to_bool, encode_varints, int_to_little_endian, little_endian_to_int,
+    read_varints,
 )
 from .op import *
 
@@ -30,30 +30,34 @@ class Script(object):
     @staticmethod
     def parse(stream):
         """
-        Read and parse Script from a stream.
+        Read and parse Script from a stream or a Reader.
         """
 
         length = read_varints(stream)
+        # Read the whole script at once and walk it by index, instead of
+        # doing one read per opcode.
+        raw = stream.read(length)
+        if len(raw) != length:
+            raise SyntaxError('Parsing script failed.')
         cmds = []
         count = 0
         while count < length:
-            current = stream.read(1)
+            current_byte = raw[count]
             count += 1
-            current_byte = current[0]
             if current_byte > OP_0 and current_byte < OP_PUSHDATA1:
                 # For a number between 1-75, the next n bytes are an element
                 n = current_byte
-                cmds.append(stream.read(n))
+                cmds.append(raw[count:count + n])
                 count += n
             elif current_byte == OP_PUSHDATA1:
                 # The next byte tells us how many bytes to read
-                data_length = little_endian_to_int(stream.read(1))
-                cmds.append(stream.read(data_length))
+                data_length = little_endian_to_int(raw[count:count + 1])
+                cmds.append(raw[count + 1:count + 1 + data_length])
                 count += data_length + 1
             elif current_byte == OP_PUSHDATA2:
                 # The next two bytes tell us how many bytes to read
-                data_length = little_endian_to_int(stream.read(2))
-                cmds.append(stream.read(data_length))
+                data_length = little_endian_to_int(raw[count:count + 2])
+                cmds.append(raw[count + 2:count + 2 + data_length])
                 count += data_length + 2
             else:
                 # We have an opcode to store
@@ -100,7 +104,7 @@ class Script(object):
             else:
                 stack.append(cmd)
 
-        if len(stack) == 0 or stack.pop() == b'':
+        if len(stack) == 0 or not cast_to_bool(stack.pop()):
             raise ScriptError
 
         return True
@@ -1,11 +1,9 @@
-from io import BytesIO
-
 import requests 
 
 from .exceptions import InvalidTransaction, ScriptError
 from .helpers import (
-    encode_varints, hash256, int_to_little_endian, little_endian_to_int, 
-    read_varints
+    Reader, encode_varints, hash256, int_to_little_endian,
+    little_endian_to_int, read_u32, read_u64, read_varints,
 )
 from .script import Script
 
@@ -66,7 +64,7 @@ class Tx(object):
 
     @staticmethod
     def parse(stream, testnet=False):
-        version = little_endian_to_int(stream.read(4))
+        version = read_u32(stream)
         inputs = []
         num_inputs = read_varints(stream)
         for _ in range(num_inputs):
@@ -75,7 +73,7 @@ class Tx(object):
         num_outputs = read_varints(stream)
         for _ in range(num_outputs):
             outputs.append(TxOut.parse(stream))
-        locktime = little_endian_to_int(stream.read(4))
+        locktime = read_u32(stream)
 
         return Tx(version, inputs, outputs, locktime, testnet=testnet)
 
@@ -165,9 +163,9 @@ class TxIn(object):
     @staticmethod
     def parse(stream, testnet=False):
         prev_tx = stream.read(32)[::-1]
-        prev_index = little_endian_to_int(stream.read(4))
+        prev_index = read_u32(stream)
         script_sig = Script.parse(stream)
-        sequence = little_endian_to_int(stream.read(4))
+        sequence = read_u32(stream)
 
         return TxIn(prev_tx, prev_index, script_sig, sequence)
 
@@ -200,7 +198,7 @@ class TxOut(object):
 
     @staticmethod
     def parse(stream, testnet=False):
-        amount = little_endian_to_int(stream.read(8))
+        amount = read_u64(stream)
         script_pubkey = Script.parse(stream)
 
         return TxOut(amount, script_pubkey)
@@ -233,10 +231,10 @@ class TxFetcher:
                 raise ValueError(f'Unexpected response: {response.text}')
             if raw[4] == 0:
                 raw = raw[:4] + raw[6:]
-                tx = Tx.parse(BytesIO(raw), testnet=testnet)
+                tx = Tx.parse(Reader(raw), testnet=testnet)
                 tx.locktime = little_endian_to_int(raw[-4:])
             else:
-                tx = Tx.parse(BytesIO(raw), testnet=testnet)
+                tx = Tx.parse(Reader(raw), testnet=testnet)
             if tx.id() != tx_id:
                 raise ValueError(f'Not the same ID: {tx.id()} vs {tx_id}.')
             TxFetcher.cache[tx_id] = tx
@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import secrets
+import time
+from collections import deque
+
+from .ecc import N, generator_sequence, precompute_generator_table
+from .helpers import BASE58_ALPHABET, encode_base58_checksum, hash160
+
+
+def prefix_ranges(prefix, testnet=False):
+    """
+    Returns the ranges (lo, hi), both inclusive, of hash160 values whose
+    P2PKH address may start with `prefix`.
+
+    Since the leading digits of a base58 string only depend on the high
+    bits of the number, candidates can be filtered on the integer value of
+    their hash160 without encoding them. The ranges are a little wider than
+    needed because the checksum is not known, so a candidate still has to
+    be confirmed against its full address.
+    """
+    for c in prefix:
+        if c not in BASE58_ALPHABET:
+            raise ValueError(f'Invalid base58 character: {c}')
+    version = 0x6f if testnet else 0x00
+    # 1 version byte, 20 bytes of hash160 and 4 bytes of checksum.
+    v_min = version << 192
+    v_max = (version + 1) << 192
+
+    ones = len(prefix) - len(prefix.lstrip('1'))
+    rest = prefix[ones:]
+    if version == 0:
+        if ones == 0:
+            raise ValueError('Mainnet addresses start with 1.')
+        # Every leading zero byte is written as one leading '1'.
+        v_max = min(v_max, 256**(25 - ones))
+        if rest:
+            v_min = max(v_min, 256**(24 - ones))
+    elif ones:
+        raise ValueError('Testnet addresses start with m or n.')
+
+    intervals = []
+    if not rest:
+        intervals.append((v_min, v_max))
+    else:
+        value = 0
+        for c in rest:
+            value = value * 58 + BASE58_ALPHABET.index(c)
+        scale = 1
+        while value * scale < v_max:
+            lo = max(value * scale, v_min)
+            hi = min((value + 1) * scale, v_max)
+            if lo < hi:
+                intervals.append((lo, hi))
+            scale *= 58
+
+    base = version << 160
+    return [((lo >> 32) - base, ((hi - 1) >> 32) - base) for lo, hi in intervals]
+
+
+def _search_chunk(start, count, prefix, ranges, compressed, testnet):
+    """
+    Check the `count` secrets following `start`. Each public key is the
+    previous one plus G, and the whole chunk is normalized with a single
+    inversion.
+    """
+    version = b'\x6f' if testnet else b'\x00'
+    matches = []
+    for i, (x, y) in enumerate(generator_sequence(start, count)):
+        if x is None:
+            continue
+        if compressed:
+            sec = (b'\x03' if y & 1 else b'\x02') + x.to_bytes(32, 'big')
+        else:
+            sec = b'\x04' + x.to_bytes(32, 'big') + y.to_bytes(32, 'big')
+        h160 = hash160(sec)
+        value = int.from_bytes(h160, 'big')
+        for lo, hi in ranges:
+            if lo <= value <= hi:
+                address = encode_base58_checksum(version + h160)
+                if address.startswith(prefix):
+                    matches.append(((start + i) % N, address))
+                break
+    return matches, count
+
+
+def search(prefix, compressed=True, testnet=False, start=None,
+           processes=None, chunk_size=4096, max_results=1, progress=None):
+    """
+    Search for secrets whose P2PKH address starts with `prefix`.
+
+    Secrets are walked sequentially from `start` (random by default) in
+    chunks of `chunk_size`, spread over a pool of `processes` workers (all
+    CPUs by default, 0 to stay in this process). After every chunk
+    progress(checked, rate) is called with the number of keys checked so
+    far and the keys per second. Returns a list of (secret, address).
+    """
+    ranges = prefix_ranges(prefix, testnet)
+    if not ranges:
+        raise ValueError(f'No address can start with {prefix}.')
+    if start is None:
+        start = secrets.randbelow(N - 1) + 1
+    # Build the generator table before forking so the workers share it.
+    precompute_generator_table()
+
+    results = []
+    checked = 0
+    began = time.time()
+
+    def record(matches, count):
+        nonlocal checked
+        results.extend(matches)
+        checked += count
+        if progress is not None:
+            elapsed = time.time() - began
+            progress(checked, checked / elapsed if elapsed else 0.0)
+
+    if processes == 0:
+        while len(results) < max_results:
+            record(*_search_chunk(start, chunk_size, prefix, ranges,
+                                  compressed, testnet))
+            start = (start + chunk_size) % N
+        return results[:max_results]
+
+    processes = processes or os.cpu_count() or 1
+    with multiprocessing.Pool(processes) as pool:
+        pending = deque()
+        while len(results) < max_results:
+            while len(pending) < 2 * processes:
+                args = (start, chunk_size, prefix, ranges, compressed, testnet)
+                pending.append(pool.apply_async(_search_chunk, args))
+                start = (start + chunk_size) % N
+            record(*pending.popleft().get())
+        pool.terminate()
+    return results[:max_results]
@@ -0,0 +1,80 @@
+import pytest
+
+from bitcoin import backend, ecc
+from bitcoin.ecc import (
+    G, N, PrivateKey, S256Field, S256Point, addresses_for_secrets,
+    schnorr_batch_verify,
+)
+
+
+SECRETS = [1, 5002, 2020**5, 0x12345deadbeef, N - 1]
+
+
+@pytest.fixture(params=backend.available())
+def use_backend(request):
+    previous = backend.NAME
+    backend.use(request.param)
+    yield request.param
+    backend.use(previous)
+
+
+def results():
+    """
+    Outputs of the main curve operations, as plain Python values.
+    """
+    out = []
+    p = 0x12345deadbeef * G
+    for k in SECRETS:
+        q = k * p
+        out.append((q.x.val, q.y.val, q.sec(), q.address()))
+    q = S256Point.multi_mul([(SECRETS[2], G), (SECRETS[3], p)])
+    out.append((q.x.val, q.y.val))
+    out.append(addresses_for_secrets(SECRETS))
+    out.append([e.val for e in S256Field.batch_inverse([S256Field(k) for k in SECRETS])])
+    out.append((S256Field(5) / S256Field(7)).val)
+    out.append(S256Point._parse((5 * G).sec()).sec())
+    private_key = PrivateKey(SECRETS[3])
+    sig = private_key.sign_schnorr(b'msg', b'\x00' * 32)
+    out.append(sig.serialize())
+    out.append(schnorr_batch_verify([(b'msg', sig, private_key.point)]))
+    return out
+
+
+def plain(value):
+    """
+    Whether value is made of Python ints, bools, bytes and strings only.
+    """
+    if isinstance(value, (list, tuple)):
+        return all(plain(v) for v in value)
+    return type(value) in (int, bool, bytes, str)
+
+
+def test_results_are_identical(use_backend, monkeypatch):
+    monkeypatch.setattr(ecc, 'signature_cache', None)
+    backend_results = results()
+    for value in backend_results:
+        assert plain(value)
+    backend.use('python')
+    assert backend_results == results()
+
+
+def test_verify(use_backend, monkeypatch):
+    monkeypatch.setattr(ecc, 'signature_cache', None)
+    private_key = PrivateKey(SECRETS[2])
+    z = 0xec208baa0fc1c19f708a9ca96fdeff3ac3f230bb4a7ba4aede4942ad003c0f60
+    sig = private_key.sign(z)
+    assert type(sig.r) == type(sig.s) == int
+    assert private_key.point.verify(z, sig)
+    assert not private_key.point.verify(z + 1, sig)
+
+
+def test_invert_error(use_backend):
+    with pytest.raises(ZeroDivisionError):
+        backend.invert(0, N)
+    with pytest.raises(ZeroDivisionError):
+        backend.invert(N, N)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        backend.use('nope')
@@ -1,7 +1,15 @@
+import os
+import time
+
 import pytest
 
+from bitcoin import backend, ecc
 from bitcoin.ecc import (
-    G, FieldElement, Point, PrivateKey, S256Field, S256Point, Signature
+    BETA, G, LAMBDA, N, FieldElement, NoncePool, Point,
+    PointTableRegistry, PrivateKey, S256Field, S256Point, SchnorrSignature,
+    Signature, SignatureCache, addresses_for_secrets, batch_verify,
+    generator_multiples, generator_sequence, load_table, save_table,
+    schnorr_batch_verify, split_scalar, wnaf,
 )
 from bitcoin.exceptions import BadSignature
 
@@ -92,6 +100,16 @@ class TestFieldElement:
             b = FieldElement(y, prime)
             assert a**exp == b
 
+    def test_batch_inverse(self):
+        elements = [S256Field(v) for v in (1, 2, 0, 2020**5, S256Field.P - 1)]
+        inverses = S256Field.batch_inverse(elements)
+        for e, inv in zip(elements, inverses):
+            if e.val == 0:
+                assert inv == S256Field(0)
+            else:
+                assert e * inv == S256Field(1)
+        assert S256Field.batch_inverse([]) == []
+
     def test_divisions(self):
         tests = [
             (19, 2, 7, 3),
@@ -239,6 +257,32 @@ class TestPointWithFieldElement:
         )
         assert 7*p == Point(None, None, a, b)
 
+    def test_wnaf_scalar_multiplication(self, monkeypatch):
+        prime = 223
+        a = FieldElement(0, prime)
+        b = FieldElement(7, prime)
+        x = FieldElement(47, prime)
+        y = FieldElement(71, prime)
+        p = Point(x, y, a, b)
+
+        monkeypatch.setattr(Point, 'SCALAR_METHOD', 'wnaf')
+        for width in (2, 3, 4):
+            monkeypatch.setattr(Point, 'WNAF_WIDTH', width)
+            for k in range(1, 50):
+                assert k*p == p._multiply_binary(k)
+
+
+def test_wnaf():
+    for width in (2, 3, 4, 5):
+        for k in [0, 1, 2, 7, 255, 2020**5, N - 1]:
+            digits = wnaf(k, width)
+            assert sum(d << i for i, d in enumerate(digits)) == k
+            nonzero = [i for i, d in enumerate(digits) if d]
+            for d in digits:
+                assert d == 0 or (d % 2 == 1 and abs(d) < 2**(width - 1))
+            for i, j in zip(nonzero, nonzero[1:]):
+                assert j - i >= width
+
 
 class TestS256Point:
     def test_verify(self):
@@ -258,6 +302,125 @@ class TestS256Point:
             signature = Signature(r, s)
             assert p.verify(z, signature) == True
 
+    def test_public_construction_is_checked(self):
+        with pytest.raises(ValueError):
+            S256Field(S256Field.P)
+        with pytest.raises(ValueError):
+            S256Point(1, 1)
+        p = 5002 * G
+        assert not hasattr(p, '__dict__')
+        assert not hasattr(p.x, '__dict__')
+        assert S256Point(p.x.val, p.y.val) == p
+
+    def test_addition(self):
+        p = 5002 * G
+        q = 2020**5 * G
+        assert p + q == 5002 * G + 2020**5 * G == (5002 + 2020**5) * G
+        assert p + p == 10004 * G
+        assert p + -p == S256Point(None, None)
+        assert p + S256Point(None, None) == p
+
+    def test_addresses_for_secrets(self):
+        secrets = [5002, 2020**5, 0x12345deadbeef]
+        for compressed in (True, False):
+            for testnet in (True, False):
+                want = [(e * G).address(compressed, testnet) for e in secrets]
+                assert addresses_for_secrets(secrets, compressed, testnet) == want
+
+    def test_generator_multiples(self):
+        scalars = [1, 5002, N - 1, N, 0x12345deadbeef]
+        want = [(k * G).x.val if k % N else None for k in scalars]
+        assert [x for x, _ in generator_multiples(scalars)] == want
+        offset = 7 * G
+        for k, (x, y) in zip(scalars, generator_multiples(scalars, offset)):
+            assert S256Point(x, y) == k * G + offset
+        (x, y), = generator_multiples([N - 7], offset)
+        assert x is None and y is None
+
+    def test_generator_sequence(self):
+        points = generator_sequence(N - 2, 4)
+        want = [(N - 2) * G, (N - 1) * G, S256Point(None, None), G]
+        assert [S256Point(x, y) for x, y in points] == want
+
+    def test_scalar_multiplication_matches_affine(self):
+        tests = [1, 2, 3, 5002, 2020**5, 0x12345deadbeef, N - 1, N, N + 7]
+        for k in tests:
+            assert k * G == Point._multiply_binary(G, k % N)
+
+    def test_generator_table_widths(self, monkeypatch):
+        tests = [1, 15, 16, 2020**5, 0x12345deadbeef, N - 1]
+        for width in (1, 3, 5):
+            monkeypatch.setattr(ecc, 'GENERATOR_TABLE_WIDTH', width)
+            for k in tests:
+                assert k * G == Point._multiply_binary(G, k)
+
+    def test_scalar_methods(self, monkeypatch):
+        p = 0x12345deadbeef * G
+        tests = [1, 2, 31, 2020**5, N - 1, 2**255 + 1]
+        want = [p._multiply_binary(k % N) for k in tests]
+        for method in ('binary', 'wnaf'):
+            monkeypatch.setattr(S256Point, 'SCALAR_METHOD', method)
+            assert [k * p for k in tests] == want
+
+    def test_endomorphism(self):
+        p = LAMBDA * G
+        assert p.x.val == BETA * G.x.val % S256Field.P
+        assert p.y == G.y
+
+    def test_split_scalar(self):
+        tests = [0, 1, LAMBDA, N - 1, 2**128, 2020**5,
+                 0xec208baa0fc1c19f708a9ca96fdeff3ac3f230bb4a7ba4aede4942ad003c0f60]
+        for k in tests:
+            k1, k2 = split_scalar(k)
+            assert (k1 + k2 * LAMBDA - k) % N == 0
+            assert abs(k1) < 2**129 and abs(k2) < 2**129
+
+    def test_endomorphism_multiplication(self, monkeypatch):
+        p = 0x12345deadbeef * G
+        tests = [1, LAMBDA, N - 1, 2**255 + 1,
+                 0xac8d1c87e51d0d441be8b3dd5b05c8795b48875dffe00b7ffcfac23010d3a395]
+        want = [p._multiply_binary(k % N) for k in tests]
+        for method in ('binary', 'wnaf'):
+            monkeypatch.setattr(S256Point, 'SCALAR_METHOD', method)
+            for use_endomorphism in (True, False):
+                monkeypatch.setattr(S256Point, 'USE_ENDOMORPHISM', use_endomorphism)
+                assert [k * p for k in tests] == want
+
+    def test_multi_mul(self):
+        p = 0x12345deadbeef * G
+        q = 2020**5 * G
+        tests = [
+            [],
+            [(5, G)],
+            [(7, p)],
+            [(2**200 + 3, G), (N - 5, p)],
+            [(11, G), (13, p), (17, q), (19, G)],
+        ]
+        for terms in tests:
+            want = S256Point(None, None)
+            for k, point in terms:
+                want += k * point
+            assert S256Point.multi_mul(terms) == want
+
+    def test_verify_rejects_bad_signature(self):
+        private_key = PrivateKey(12345)
+        z = 0xdeadbeef
+        signature = private_key.sign(z)
+        assert private_key.point.verify(z, signature) == True
+        assert private_key.point.verify(z + 1, signature) == False
+
+    def test_verify_rejects_out_of_range(self):
+        private_key = PrivateKey(12345)
+        z = 0xdeadbeef
+        signature = private_key.sign(z)
+        # S = 0 is strict DER
+        assert Signature.parse(bytes.fromhex('3006020101020100')) == \
+            Signature(1, 0)
+        for r, s in ((0, signature.s), (N, signature.s),
+                     (signature.r, 0), (signature.r, N),
+                     (signature.r + N, signature.s)):
+            assert private_key.point.verify(z, Signature(r, s)) == False
+
     def test_serialize_uncompressed_sec(self):
         tests = [
             S256Point(
@@ -274,6 +437,22 @@ class TestS256Point:
             p1 = S256Point.parse(serialized)
             assert p0 == p1
 
+    def test_parse_cache(self):
+        S256Point.parse_cache.clear()
+        p = 0x12345deadbeef * G
+        sec = p.sec(compressed=True)
+        assert S256Point.parse(sec) == p
+        assert S256Point.parse(memoryview(sec)) == p
+        info = S256Point.parse_cache.info()
+        assert info['hits'] == 1 and info['misses'] == 1 and info['size'] == 1
+
+        S256Point.parse_cache.resize(0)
+        try:
+            assert S256Point.parse(p.sec(compressed=False)) == p
+            assert len(S256Point.parse_cache) == 0
+        finally:
+            S256Point.parse_cache.resize(10000)
+
     def test_address(self):
         e = 5002
         pub = e * G
@@ -287,6 +466,285 @@ class TestS256Point:
         pub = e * G
         assert pub.address(compressed=True, testnet=False) == '1F1Pn2y6pDb68E5nYJJeba4TLg2U7B6KF1'
 
+    def test_segwit_addresses(self):
+        # BIP84 and BIP86 test vectors, first receiving address
+        pub = S256Point.parse(bytes.fromhex(
+            '0330d54fd0dd420a6e5f8d3624f5f3482cae350f79d5f0753bf5beef9c2d91af3c'))
+        assert pub.p2wpkh_address() == 'bc1qcr8te4kr609gcawutmrza0j4xv80jy8z306fyu'
+
+        pub = S256Point.lift_x(bytes.fromhex(
+            'cc8a4bc64d897bddc5fbc2f670f7a8ba0b386779106cf1223c6fc5d7cd6fc115'))
+        assert pub.taproot_output_key().xonly().hex() == \
+            'a60869f0dbcf1dc659c9cecbaf8050135ea9e8cdc487053f1dc6880949dc684c'
+        assert pub.p2tr_address() == \
+            'bc1p5cyxnuxmeuwuvkwfem96lqzszd02n6xdcjrs20cac6yqjjwudpxqkedrcr'
+        assert (-pub).p2tr_address() == pub.p2tr_address()
+        assert pub.p2tr_address(testnet=True).startswith('tb1p')
+
+
+class TestBatchVerify:
+    def test_batch_verify(self):
+        items = []
+        for secret in (1, 5002, 0x12345deadbeef):
+            private_key = PrivateKey(secret)
+            z = secret * 0x1f2e3d4c5b6a
+            items.append((z, private_key.sign(z), private_key.point))
+        assert batch_verify(items) == [True, True, True]
+
+        z, sig, point = items[1]
+        items[1] = (z + 1, sig, point)
+        assert batch_verify(items) == [True, False, True]
+        assert batch_verify([]) == []
+
+        z, sig, point = items[0]
+        bad = [(z, Signature(1, 0), point), (z, Signature(0, sig.s), point),
+               (z, Signature(sig.r, N), point), (z, Signature(N, sig.s), point)]
+        assert batch_verify(items[:1] + bad) == [True] + [False] * 4
+
+
+class TestPointTableRegistry:
+    def test_lookup(self):
+        registry = PointTableRegistry(threshold=2, width=3)
+        p = 5002 * G
+        assert registry.lookup(p) is None
+        table = registry.lookup(p)
+        assert table is not None
+        assert registry.lookup(p) is table
+        assert registry.info()['size'] == 1
+
+    def test_eviction(self):
+        registry = PointTableRegistry(threshold=1, width=2)
+        registry.tables.resize(1)
+        p, q = 5002 * G, 5003 * G
+        registry.lookup(p)
+        registry.lookup(q)
+        assert registry.info()['size'] == 1
+        assert registry.info()['evictions'] == 1
+
+    def test_evicted_point_is_counted_again(self):
+        registry = PointTableRegistry(threshold=3, width=2)
+        registry.tables.resize(1)
+        p, q = 5002 * G, 5003 * G
+        for _ in range(3):
+            registry.lookup(p)
+        for _ in range(3):
+            registry.lookup(q)
+        assert registry.info()['evictions'] == 1
+        # p lost its table and needs threshold lookups to get it back
+        assert registry.lookup(p) is None
+        assert registry.lookup(p) is None
+        assert registry.lookup(p) is not None
+        assert registry.info()['evictions'] == 2
+
+    def test_max_bytes_below_one_table(self):
+        registry = PointTableRegistry(width=2)
+        with pytest.raises(ValueError):
+            PointTableRegistry(width=2, max_bytes=registry.table_bytes - 1)
+        PointTableRegistry(width=2, max_bytes=registry.table_bytes)
+
+    def test_multiplication_with_tables(self, monkeypatch):
+        monkeypatch.setattr(ecc, 'point_tables', PointTableRegistry(threshold=2))
+        monkeypatch.setattr(ecc, 'signature_cache', None)
+        private_key = PrivateKey(0x12345deadbeef)
+        p = private_key.point
+        tests = [1, LAMBDA, N - 1, 2**255 + 1]
+        want = [p._multiply_binary(k % N) for k in tests]
+        assert [k * p for k in tests] == want
+        assert ecc.point_tables.info()['size'] == 1
+        z = 0xabcdef
+        sig = private_key.sign(z)
+        assert p.verify(z, sig) == True
+        assert p.verify(z + 1, sig) == False
+
+
+class TestTableFiles:
+    def test_generator_table(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ecc, '_GENERATOR_TABLE', None)
+        monkeypatch.setattr(ecc, 'GENERATOR_TABLE_WIDTH', 4)
+        path = tmp_path / 'g.tab'
+        save_table(path, width=3)
+        assert load_table(path) == G
+        assert ecc.GENERATOR_TABLE_WIDTH == 3
+        tests = [1, 2020**5, N - 1]
+        assert [k * G for k in tests] == [G._multiply_binary(k) for k in tests]
+
+    def test_point_table(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ecc, 'point_tables', PointTableRegistry(threshold=100))
+        p = 5002 * G
+        path = tmp_path / 'p.tab'
+        save_table(path, p, width=2)
+        assert load_table(path) == p
+        assert ecc.point_tables.lookup(p) is not None
+        assert 2020**5 * p == p._multiply_binary(2020**5)
+
+    def test_corrupted(self, tmp_path):
+        path = tmp_path / 'p.tab'
+        save_table(path, 5002 * G, width=2)
+        data = bytearray(path.read_bytes())
+        data[-1] ^= 1
+        path.write_bytes(bytes(data))
+        with pytest.raises(ValueError):
+            load_table(path)
+        path.write_bytes(b'not a table' * 10)
+        with pytest.raises(ValueError):
+            load_table(path)
+
+    def test_bad_layout(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ecc, 'point_tables', PointTableRegistry(threshold=100))
+        path = tmp_path / 'p.tab'
+        save_table(path, 5002 * G, width=2)
+        data = path.read_bytes()
+        magic, version, width, rows, checksum = \
+            ecc._TABLE_HEADER.unpack_from(data)
+        for width, rows in ((0, rows), (2, rows - 1), (4, rows)):
+            header = ecc._TABLE_HEADER.pack(magic, version, width, rows, checksum)
+            path.write_bytes(header + data[ecc._TABLE_HEADER.size:])
+            with pytest.raises(ValueError):
+                load_table(path)
+
+    def test_point_table_needs_registry(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ecc, 'point_tables', None)
+        path = tmp_path / 'p.tab'
+        save_table(path, 5002 * G, width=2)
+        with pytest.raises(ValueError):
+            load_table(path)
+
+    def test_backend_switch_keeps_mapped_table(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ecc, '_GENERATOR_TABLE', None)
+        monkeypatch.setattr(ecc, 'GENERATOR_TABLE_WIDTH', 4)
+        path = tmp_path / 'g.tab'
+        save_table(path, width=3)
+        load_table(path)
+        table = ecc._GENERATOR_TABLE
+        previous = backend.NAME
+        try:
+            for name in backend.available():
+                backend.use(name)
+                assert ecc._GENERATOR_TABLE is table
+                assert 2020**5 * G == G._multiply_binary(2020**5)
+        finally:
+            backend.use(previous)
+
+
+class TestRecover:
+    def test_recover(self):
+        for secret in (1, 5002, N - 1):
+            private_key = PrivateKey(secret)
+            z = 0xdeadbeef + secret
+            sig, recid = private_key.sign_recoverable(z)
+            assert private_key.point.verify(z, sig)
+            assert sig.s <= N // 2
+            assert S256Point.recover(z, sig, recid) == private_key.point
+
+    def test_recover_wrong_id(self):
+        private_key = PrivateKey(5002)
+        sig, recid = private_key.sign_recoverable(1234)
+        assert S256Point.recover(1234, sig, recid ^ 1) != private_key.point
+        with pytest.raises(ValueError):
+            S256Point.recover(1234, sig, 4)
+        with pytest.raises(BadSignature):
+            S256Point.recover(1234, Signature(0, sig.s), recid)
+
+
+class TestSignatureCache:
+    def test_cache(self):
+        cache = SignatureCache(max_bytes=2 * SignatureCache.ENTRY_BYTES)
+        private_key = PrivateKey(5002)
+        sigs = [(z, private_key.sign(z)) for z in (1, 2, 3)]
+        for z, sig in sigs:
+            assert not cache.contains(z, sig, private_key.point)
+            cache.add(z, sig, private_key.point)
+        assert len(cache) == 2
+        assert not cache.contains(1, sigs[0][1], private_key.point)
+        assert cache.contains(3, sigs[2][1], private_key.point)
+        assert not cache.contains(3, sigs[1][1], private_key.point)
+        info = cache.info()
+        assert info['hits'] == 1 and info['evictions'] == 1
+        assert info['max_bytes'] == 2 * SignatureCache.ENTRY_BYTES
+
+    def test_salted(self):
+        private_key = PrivateKey(5002)
+        sig = private_key.sign(1)
+        a, b = SignatureCache(), SignatureCache()
+        assert a._key(1, sig, private_key.point) != b._key(1, sig, private_key.point)
+
+    def test_verify_uses_cache(self, monkeypatch):
+        cache = SignatureCache()
+        monkeypatch.setattr(ecc, 'signature_cache', cache)
+        private_key = PrivateKey(5002)
+        sig = private_key.sign(7)
+        assert private_key.point.verify(8, sig) == False
+        assert len(cache) == 0
+        assert private_key.point.verify(7, sig) == True
+        assert cache.contains(7, sig, private_key.point)
+
+        monkeypatch.setattr(ecc, '_multi_multiply', None)
+        assert private_key.point.verify(7, sig) == True
+        assert batch_verify([(7, sig, private_key.point)]) == [True]
+
+
+class TestSchnorr:
+    # Test vectors 0 and 1 from BIP340: secret, public key, aux_rand,
+    # message, signature.
+    VECTORS = [
+        (3,
+         'f9308a019258c31049344f85f89d5229b531c845836f99b08601f113bce036f9',
+         '00' * 32,
+         '00' * 32,
+         'e907831f80848d1069a5371b402410364bdf1c5f8307b0084c55f1ce2dca8215'
+         '25f66a4a85ea8b71e482a74f382d2ce5ebeee8fdb2172f477df4900d310536c0'),
+        (0xb7e151628aed2a6abf7158809cf4f3c762e7160f38b4da56a784d9045190cfef,
+         'dff1d77f2a671c5f36183726db2341be58feae1da2deced843240f7b502ba659',
+         '00' * 31 + '01',
+         '243f6a8885a308d313198a2e03707344a4093822299f31d0082efa98ec4e6c89',
+         '6896bd60eeae296db48a229ff71dfe071bde413e6d43f917dc8dcf8c78de3341'
+         '8906d11ac976abccb20b091292bff4ea897efcb639ea871cfa95f6de339e4b0a'),
+    ]
+
+    def test_sign(self):
+        for secret, xonly, aux_rand, msg, sig in self.VECTORS:
+            private_key = PrivateKey(secret)
+            assert private_key.point.xonly().hex() == xonly
+            signature = private_key.sign_schnorr(bytes.fromhex(msg),
+                                                 bytes.fromhex(aux_rand))
+            assert signature.serialize().hex() == sig
+
+    def test_verify(self):
+        for _, xonly, _, msg, sig in self.VECTORS:
+            point = S256Point.lift_x(bytes.fromhex(xonly))
+            signature = SchnorrSignature.parse(bytes.fromhex(sig))
+            assert point.verify_schnorr(bytes.fromhex(msg), signature)
+            assert not point.verify_schnorr(b'\x01' * 32, signature)
+            bad = SchnorrSignature(signature.r, N - signature.s)
+            assert not point.verify_schnorr(bytes.fromhex(msg), bad)
+
+    def test_odd_key(self):
+        private_key = PrivateKey(5002)
+        assert private_key.point.y.val % 2 == 1
+        signature = private_key.sign_schnorr(b'msg')
+        assert private_key.point.verify_schnorr(b'msg', signature)
+
+    def test_lift_x(self):
+        p = 5002 * G
+        assert S256Point.lift_x(p.x.val) in (p, -p)
+        with pytest.raises(ValueError):
+            S256Point.lift_x(5)
+
+    def test_batch_verify(self):
+        items = []
+        for secret in range(1, 7):
+            private_key = PrivateKey(secret * 0x1234567)
+            msg = bytes([secret]) * 32
+            items.append((msg, private_key.sign_schnorr(msg), private_key.point))
+        assert schnorr_batch_verify(items) == [True] * 6
+        assert schnorr_batch_verify([]) == []
+
+        msg, sig, point = items[2]
+        items[2] = (b'\x00' * 32, sig, point)
+        msg, sig, point = items[5]
+        items[5] = (msg, SchnorrSignature(5, sig.s), point)
+        assert schnorr_batch_verify(items) == [True, True, False, True, True, False]
+
 
 class TestSignature:
     def test_der(self):
@@ -347,6 +805,110 @@ class TestSignature:
             with pytest.raises(BadSignature):
                 Signature.parse(test)
 
+    def test_parse_strict(self):
+        tests = [
+            # negative R
+            '3006020180020101',
+            # R padded with an unneeded zero byte
+            '300702020001020101',
+            # empty S
+            '3005020101020000',
+            # S padded with an unneeded zero byte
+            '300702010102020001',
+            # truncated
+            '30060201010201',
+        ]
+        for test in tests:
+            with pytest.raises(BadSignature):
+                Signature.parse(bytes.fromhex(test))
+
+        # a zero byte is needed when the high bit is set
+        assert Signature.parse(bytes.fromhex('30070202008002017f')) == \
+            Signature(0x80, 0x7f)
+
+    def test_parse_offset(self):
+        signature = Signature(
+            0x37206a0610995c58074999cb9767b87af4c4978db68c06e8e6e81d282047a7c6,
+            0x8ca63759c1157ebeaec0d03cecca119fc9a75bf8e6d0fa65c841c8e2738cdaec
+        )
+        der = signature.der()
+        data = memoryview(b'\xff\xff' + der + b'\x01')
+
+        parsed = Signature.parse(data, 2, len(der))
+
+        assert parsed == signature
+        assert parsed._der is None
+        assert parsed.der() == der
+        assert Signature.parse(der).der() is der
+
+    def test_parse_many(self):
+        der = Signature(1, 2).der()
+        results = Signature.parse_many([der, der + b'\x00', der])
+        assert results[0] == Signature(1, 2)
+        assert results[1] is None
+        assert results[2] == Signature(1, 2)
+
+    def test_der_cached(self):
+        signature = Signature(1, 2)
+        assert signature.der() is signature.der()
+        signature.s = 3
+        assert Signature.parse(signature.der()) == Signature(1, 3)
+
+
+class TestNoncePool:
+    def test_sign_with_pool(self):
+        private_key = PrivateKey(5002)
+        pool = NoncePool(size=4)
+        pool.fill()
+        assert len(pool) == 4
+        for z in range(1, 7):
+            sig = private_key.sign(z, nonce_pool=pool)
+            assert private_key.point.verify(z, sig)
+        assert len(pool) == 0
+
+    def test_nonces_are_not_reused(self):
+        pool = NoncePool(size=8)
+        pool.fill()
+        nonces = [pool.get() for _ in range(10)]
+        assert len(set(k for k, _, _ in nonces)) == 10
+        for k, r, k_inv in nonces:
+            assert (k * G).x.val % N == r
+            assert k * k_inv % N == 1
+
+    def test_background_refill(self):
+        with NoncePool(size=2) as pool:
+            deadline = time.time() + 10
+            while len(pool) < 2 and time.time() < deadline:
+                time.sleep(0.01)
+            assert len(pool) == 2
+        assert pool._thread is None
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+    def test_fork_does_not_share_nonces(self):
+        private_key = PrivateKey(5002)
+        pool = NoncePool(size=4)
+        pool.fill()
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(read_end)
+                child_empty = len(pool) == 0
+                sig = private_key.sign(1, nonce_pool=pool)
+                os.write(write_end, bytes([child_empty])
+                         + sig.r.to_bytes(32, 'big'))
+            finally:
+                os._exit(0)
+        os.close(write_end)
+        with os.fdopen(read_end, 'rb') as f:
+            data = f.read()
+        os.waitpid(pid, 0)
+        sig = private_key.sign(1, nonce_pool=pool)
+
+        assert data[0] == 1
+        assert int.from_bytes(data[1:], 'big') != sig.r
+        assert len(pool) == 3
+
 
 class TestPrivateKey:
     def test_wif(self):
@@ -0,0 +1,82 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from bitcoin.ecc import FieldElement, Point
+from bitcoin.fieldarray import FieldArray, PointArray, curve_points
+
+
+PRIME = 223
+
+
+def elements(values, prime=PRIME):
+    return [FieldElement(v, prime) for v in values]
+
+
+class TestFieldArray:
+    def test_range_check(self):
+        with pytest.raises(ValueError):
+            FieldArray([1, PRIME], PRIME)
+
+    @pytest.mark.parametrize('prime', [PRIME, 4294967311])
+    def test_arithmetic(self, prime):
+        xs = [0, 1, 2, 100, prime - 1, prime // 2]
+        ys = [5, prime - 1, 0, 7, prime - 2, 3]
+        a, b = FieldArray(xs, prime), FieldArray(ys, prime)
+        for i, (x, y) in enumerate(zip(elements(xs, prime), elements(ys, prime))):
+            assert (a + b)[i] == x + y
+            assert (a - b)[i] == x - y
+            assert (a * b)[i] == x * y
+            assert (a ** 5)[i] == x ** 5
+            assert (a ** -3)[i] == x ** -3
+            assert (-a)[i] == FieldElement(0, prime) - x
+            assert (3 * a)[i] == 3 * x
+            if y.val:
+                assert (a / b)[i] == x / y
+                assert (b * b.inverse())[i] == FieldElement(1, prime)
+
+    def test_different_fields(self):
+        with pytest.raises(TypeError):
+            FieldArray([1], 7) + FieldArray([1], 11)
+
+
+class TestPointArray:
+    def test_addition_matches_point(self):
+        a = FieldElement(0, PRIME)
+        b = FieldElement(7, PRIME)
+        pairs = [
+            ((192, 105), (17, 56)),
+            ((47, 71), (47, 71)),
+            ((47, 71), (47, PRIME - 71)),
+            ((143, 98), (76, 66)),
+            (None, (17, 56)),
+            ((17, 56), None),
+        ]
+
+        def point(xy):
+            if xy is None:
+                return Point(None, None, a, b)
+            return Point(FieldElement(xy[0], PRIME), FieldElement(xy[1], PRIME), a, b)
+
+        left = PointArray.from_points([point(p) for p, _ in pairs])
+        right = PointArray.from_points([point(q) for _, q in pairs])
+        total = left + right
+        for i, (p, q) in enumerate(pairs):
+            assert total[i] == point(p) + point(q)
+
+    def test_curve_points_and_orders(self):
+        points = curve_points(0, 7, PRIME)
+        for p in points:
+            assert p.y**2 == p.x**3 + FieldElement(7, PRIME)
+        want = {(x, y) for x in range(PRIME) for y in range(PRIME)
+                if (y * y - x**3 - 7) % PRIME == 0}
+        assert set(zip(points.x.values.tolist(), points.y.values.tolist())) == want
+        assert len(points) == len(want)
+        orders = points.orders()
+        group_order = len(points) + 1
+        assert all(group_order % int(n) == 0 for n in orders)
+
+        g = Point(FieldElement(47, PRIME), FieldElement(71, PRIME),
+                  FieldElement(0, PRIME), FieldElement(7, PRIME))
+        i = [j for j, p in enumerate(points) if p == g][0]
+        assert orders[i] == 21
@@ -0,0 +1,57 @@
+import pytest
+
+from bitcoin import hashes, helpers
+from bitcoin.op import op_hash160, op_ripemd160
+
+
+VECTORS = [
+    (b'', '9c1185a5c5e9fc54612808977ee8f548b2258d31'),
+    (b'a', '0bdc9d2d256b3ee9daae347be6f4dc835a467ffe'),
+    (b'abc', '8eb208f7e05d987a9b044a8e98c6b087f15a0bfc'),
+    (b'message digest', '5d0689ef49d2fae572b881b123a85ffa21595f36'),
+    (b'abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq',
+     '12a053384a9c0c88e405a06c27dcf49ada62eb2b'),
+    (b'1234567890' * 8, '9b752e45573d4b39f4dbd3323cab82bf63326bfb'),
+]
+
+
+@pytest.fixture(params=hashes.available())
+def use_backend(request):
+    previous = hashes.NAME
+    hashes.use(request.param)
+    yield request.param
+    hashes.use(previous)
+
+
+def test_vectors(use_backend):
+    for data, digest in VECTORS:
+        assert hashes.ripemd160(data).hex() == digest
+        assert helpers.ripemd160(data).hex() == digest
+
+
+def test_python_matches_backend():
+    for n in range(130):
+        data = bytes(range(n))
+        assert hashes.ripemd160_python(data) == hashes.ripemd160(data)
+
+
+def test_hash160(use_backend):
+    sec = bytes.fromhex(
+        '0330d54fd0dd420a6e5f8d3624f5f3482cae350f79d5f0753bf5beef9c2d91af3c')
+    want = 'c0cebcd6c3d3ca8c75dc5ec62ebe55330ef910e2'
+    assert helpers.hash160(sec).hex() == want
+
+    stack = [sec]
+    op_hash160(stack=stack)
+    assert stack[0].hex() == want
+    stack = [b'abc']
+    op_ripemd160(stack=stack)
+    assert stack[0].hex() == VECTORS[2][1]
+
+
+def test_use(use_backend):
+    assert hashes.NAME == use_backend
+    assert 'python' in hashes.available()
+    with pytest.raises(ValueError):
+        hashes.use('nope')
+    assert hashes.NAME == use_backend
@@ -0,0 +1,109 @@
+import pytest
+
+from bitcoin import hd
+from bitcoin.hd import (
+    HARDENED, ExtendedKey, ExtendedPrivateKey, parse_path,
+)
+
+
+# Test vector 1 from BIP32
+SEED = bytes.fromhex('000102030405060708090a0b0c0d0e0f')
+VECTORS = [
+    ('m',
+     'xpub661MyMwAqRbcFtXgS5sYJABqqG9YLmC4Q1Rdap9gSE8NqtwybGhePY2gZ29ESFjqJoCu1Rupje8YtGqsefD265TMg7usUDFdp6W1EGMcet8',
+     'xprv9s21ZrQH143K3QTDL4LXw2F7HEK3wJUD2nW2nRk4stbPy6cq3jPPqjiChkVvvNKmPGJxWUtg6LnF5kejMRNNU3TGtRBeJgk33yuGBxrMPHi'),
+    ("m/0'",
+     'xpub68Gmy5EdvgibQVfPdqkBBCHxA5htiqg55crXYuXoQRKfDBFA1WEjWgP6LHhwBZeNK1VTsfTFUHCdrfp1bgwQ9xv5ski8PX9rL2dZXvgGDnw',
+     'xprv9uHRZZhk6KAJC1avXpDAp4MDc3sQKNxDiPvvkX8Br5ngLNv1TxvUxt4cV1rGL5hj6KCesnDYUhd7oWgT11eZG7XnxHrnYeSvkzY7d2bhkJ7'),
+    ("m/0'/1",
+     'xpub6ASuArnXKPbfEwhqN6e3mwBcDTgzisQN1wXN9BJcM47sSikHjJf3UFHKkNAWbWMiGj7Wf5uMash7SyYq527Hqck2AxYysAA7xmALppuCkwQ',
+     'xprv9wTYmMFdV23N2TdNG573QoEsfRrWKQgWeibmLntzniatZvR9BmLnvSxqu53Kw1UmYPxLgboyZQaXwTCg8MSY3H2EU4pWcQDnRnrVA1xe8fs'),
+]
+
+
+def test_parse_path():
+    assert parse_path('m') == []
+    assert parse_path("m/44'/0h/1") == [44 + HARDENED, HARDENED, 1]
+    assert parse_path([1, 2]) == [1, 2]
+
+
+def test_bip32_vector():
+    root = ExtendedPrivateKey.from_seed(SEED)
+    for path, xpub, xprv in VECTORS:
+        node = root.derive(path)
+        assert node.serialize() == xprv
+        assert node.public_key().serialize() == xpub
+        assert ExtendedKey.parse(xprv) == node
+        assert ExtendedKey.parse(xpub) == node.public_key()
+
+
+def test_public_derivation():
+    root = ExtendedPrivateKey.from_seed(SEED)
+    account = root.derive("m/0'")
+    xpub = account.public_key()
+    assert xpub.derive('M/1/5').point == account.derive('m/1/5').point
+    with pytest.raises(ValueError):
+        xpub.child(HARDENED)
+
+
+def test_node_cache():
+    hd.node_cache.clear()
+    xpub = ExtendedKey.parse(VECTORS[2][1])
+    xpub.derive('M/0/1')
+    xpub.derive('M/0/2')
+    info = hd.node_cache.info()
+    assert info['hits'] == 1
+    assert info['size'] == 3
+
+    # private derivation does not keep private keys around
+    hd.node_cache.clear()
+    ExtendedPrivateKey.from_seed(SEED).derive("m/0'/1/2")
+    assert len(hd.node_cache) == 0
+
+
+def test_node_cache_network():
+    hd.node_cache.clear()
+    xpub = ExtendedPrivateKey.from_seed(SEED).public_key()
+    testnet_xpub = ExtendedPrivateKey.from_seed(SEED, testnet=True).public_key()
+    child = xpub.child(0)
+    testnet_child = testnet_xpub.child(0)
+    assert hd.node_cache.info()['hits'] == 1
+    assert testnet_child.testnet
+    assert testnet_child.serialize().startswith('tpub')
+    assert child.serialize().startswith('xpub')
+    assert testnet_child.point == child.point
+
+
+def test_derive_range():
+    root = ExtendedPrivateKey.from_seed(SEED, testnet=True)
+    xpub = root.public_key()
+    children = xpub.derive_range('M/0', 3, 4)
+    private_children = root.derive_range('m/0', 3, 4)
+    for i, (child, private_child) in enumerate(zip(children, private_children)):
+        want = root.derive([0, 3 + i])
+        assert child == want.public_key()
+        assert private_child == want
+        assert private_child.point == want.point
+        assert child.address() == want.private_key.point.address(testnet=True)
+        for node in (child, private_child):
+            assert node.child_number == want.child_number == 3 + i
+            assert node.parent_fingerprint == want.parent_fingerprint
+            assert node.serialize() == (want.public_key().serialize()
+                                        if node is child else want.serialize())
+
+
+def test_derive_range_fingerprints_parent_once(monkeypatch):
+    root = ExtendedPrivateKey.from_seed(SEED)
+    parent = root.derive('m/0')
+    xpub = parent.public_key()
+    calls = []
+    fingerprint = ExtendedKey.fingerprint
+
+    def counting(self):
+        calls.append(self)
+        return fingerprint(self)
+
+    monkeypatch.setattr(ExtendedKey, 'fingerprint', counting)
+    assert len(xpub.derive_range('M', 0, 50)) == 50
+    assert len(parent.derive_range('m', 0, 50)) == 50
+    assert len(calls) == 2
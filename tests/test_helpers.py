@@ -1,6 +1,10 @@
+import hashlib
+import mmap
 from io import BytesIO
 
-from bitcoin import helpers
+import pytest
+
+from bitcoin import backend, helpers
 
 
 def test_encode_base58():
@@ -26,6 +30,50 @@ def test_decode_base58():
     assert got == addr
 
 
+def test_decode_base58_checksum():
+    wif = 'KwDiBf89QgGbjEhKnhXJuH7LrciVrZi3qYjgd9M7rFU73sVHnoWn'
+    payload = helpers.decode_base58_checksum(wif)
+    assert payload == b'\x80' + (1).to_bytes(32, 'big') + b'\x01'
+    assert helpers.encode_base58_checksum(payload) == wif
+
+    payload = b'\x00\x00\x00' + bytes(range(1, 80))
+    s = helpers.encode_base58_checksum(payload)
+    assert s.startswith('111') and s[3] != '1'
+    assert helpers.decode_base58_checksum(s) == payload
+
+    for bad in ('', '1', wif[:-1] + 'o', wif[:-1] + 'l', wif + '1'):
+        with pytest.raises(ValueError):
+            helpers.decode_base58_checksum(bad)
+
+
+@pytest.mark.parametrize('name', backend.available())
+def test_base58_long(name, monkeypatch):
+    payloads = [bytes(range(256)) * 8, b'\x00\x00' + bytes(range(1, 256)) * 9,
+                bytes(3000)]
+    previous = backend.NAME
+    backend.use(name)
+    try:
+        encoded = [helpers.encode_base58(p) for p in payloads]
+        decoded = [helpers._decode_base58_raw(s) for s in encoded]
+    finally:
+        backend.use(previous)
+    assert decoded == payloads
+    # the chunked loop gives the same strings
+    monkeypatch.setattr(helpers, '_BASE58_SPLIT_BYTES', 10**6)
+    monkeypatch.setattr(helpers, '_BASE58_SPLIT_DIGITS', 10**6)
+    assert [helpers.encode_base58(p) for p in payloads] == encoded
+    assert [helpers._decode_base58_raw(s) for s in encoded] == payloads
+
+
+def test_base58_checksum_many():
+    payloads = [b'\x00' + bytes(20), b'\x6f' + bytes(range(20)), b'\x80']
+    strings = helpers.encode_base58_checksum_many(payloads)
+    assert strings == [helpers.encode_base58_checksum(p) for p in payloads]
+    strings.append(strings[1][:-1] + '1')
+    strings.append('not base58')
+    assert helpers.decode_base58_checksum_many(strings) == payloads + [None, None]
+
+
 def test_int_to_little_endian():
     n = helpers.int_to_little_endian(500, 16)
     assert n.hex() == 'f4010000000000000000000000000000'
@@ -68,6 +116,8 @@ def test_decode_num():
     ]
     for x, y in tests:
         assert helpers.decode_num(x) == y
+        assert helpers.decode_num(bytearray(x)) == y
+        assert helpers.decode_num(memoryview(x)) == y
 
 
 def test_encode_num():
@@ -82,3 +132,144 @@ def test_encode_num():
     ]
     for x, y in tests:
         assert helpers.encode_num(x) == y
+
+
+def test_num_round_trip():
+    tests = [
+        (127, b'\x7f'),
+        (128, b'\x80\x00'),
+        (-128, b'\x80\x80'),
+        (255, b'\xff\x00'),
+        (256, b'\x00\x01'),
+        (-32768, b'\x00\x80\x80'),
+        (2**31 - 1, b'\xff\xff\xff\x7f'),
+    ]
+    for x, y in tests:
+        assert helpers.encode_num(x) == y
+        assert helpers.decode_num(y) == x
+    for x in range(-1000, 1000):
+        assert helpers.decode_num(helpers.encode_num(x)) == x
+    # negative zero
+    assert helpers.decode_num(b'\x00\x80') == 0
+
+
+def test_cast_to_bool():
+    for element in (b'', b'\x00', b'\x80', b'\x00\x00', b'\x00\x00\x80'):
+        assert not helpers.cast_to_bool(element)
+    for element in (b'\x01', b'\x81', b'\x00\x01', b'\x01\x80', b'\x00\x81'):
+        assert helpers.cast_to_bool(element)
+
+
+def test_tagged_hash():
+    tag_hash = hashlib.sha256(b'BIP0340/challenge').digest()
+    for msg in (b'', b'abc', b'\x00' * 100):
+        want = hashlib.sha256(tag_hash + tag_hash + msg).digest()
+        assert helpers.tagged_hash('BIP0340/challenge', msg) == want
+        assert helpers.tagged_hash('BIP0340/challenge', msg) == want
+
+
+def test_lru_cache():
+    cache = helpers.LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+    assert cache.info() == {
+        'hits': 2, 'misses': 1, 'evictions': 1, 'size': 2, 'maxsize': 2,
+    }
+
+    assert cache.pop('a') == 1 and cache.pop('a') is None
+    cache.put('a', 1)
+
+    cache.resize(1)
+    assert len(cache) == 1 and 'a' in cache
+    cache.resize(0)
+    cache.put('d', 4)
+    assert len(cache) == 0
+
+
+def test_segwit_address():
+    program = bytes.fromhex('c0cebcd6c3d3ca8c75dc5ec62ebe55330ef910e2')
+    address = 'bc1qcr8te4kr609gcawutmrza0j4xv80jy8z306fyu'
+    assert helpers.encode_segwit_address(0, program) == address
+    assert helpers.decode_segwit_address(address) == (0, program)
+    assert helpers.decode_segwit_address(address.upper()) == (0, program)
+
+    program = bytes(range(32))
+    for version in (0, 1, 16):
+        for testnet in (False, True):
+            address = helpers.encode_segwit_address(version, program, testnet)
+            assert address.startswith('tb1' if testnet else 'bc1')
+            assert helpers.decode_segwit_address(address, testnet) == \
+                (version, program)
+
+
+def test_decode_segwit_address_errors():
+    program = bytes(20)
+    v0 = helpers.encode_segwit_address(0, program)
+    v1 = helpers.encode_segwit_address(1, program)
+    hrp, data, bech32m = helpers.decode_bech32(v0)
+    # version 1 with a bech32 checksum, version 0 with a bech32m checksum
+    v1_bech32 = helpers.encode_bech32(hrp, [1] + list(data[1:]))
+    v0_bech32m = helpers.encode_bech32(hrp, data, bech32m=True)
+    tests = [
+        v0[:-1] + ('q' if v0[-1] != 'q' else 'p'),
+        v0[:5] + v0[5:].upper(),
+        v0.replace('1', 'b', 1),
+        v1_bech32,
+        v0_bech32m,
+        helpers.encode_segwit_address(0, program, testnet=True),
+        helpers.encode_bech32('bc', [0]),
+    ]
+    for address in tests:
+        with pytest.raises(ValueError):
+            helpers.decode_segwit_address(address)
+    assert helpers.decode_segwit_address_many([v0, tests[0], v1]) == \
+        [(0, program), None, (1, program)]
+    with pytest.raises(ValueError):
+        helpers.encode_segwit_address(0, bytes(21))
+
+
+def test_reader():
+    data = bytes.fromhex('01' 'fd2b02' '7f110100' '1234567890abcdef') + b'tail'
+    reader = helpers.Reader(data)
+
+    assert reader.u8() == 1
+    assert reader.varint() == 555
+    assert reader.u32() == 70015
+    assert reader.u64() == 0xefcdab9078563412
+    view = reader.slice(2)
+    assert isinstance(view, memoryview) and bytes(view) == b'ta'
+    assert len(reader) == 2
+    assert reader.read(10) == b'il'
+    assert reader.read(1) == b''
+    for read in (reader.u8, reader.u32, reader.u64, reader.varint):
+        with pytest.raises(ValueError):
+            read()
+    with pytest.raises(ValueError):
+        reader.slice(1)
+    # a view that does not start at the beginning of its buffer
+    reader = helpers.Reader(memoryview(data)[1:])
+    assert reader.varint() == 555
+    assert reader.read(4) == data[4:8]
+
+
+def test_read_fixed_width():
+    data = bytes.fromhex('7f110100' '13' '0eed5eb9bb8e01')
+    for stream in (BytesIO(data), helpers.Reader(data)):
+        assert helpers.read_u32(stream) == 70015
+        assert helpers.read_u64(stream) == 0x018ebbb95eed0e13
+
+
+def test_reader_read_varints(tmp_path):
+    path = tmp_path / 'varints'
+    path.write_bytes(b'\xfd\xff\x00' + b'\xff\x13\x0e\xed^\xb9\xbb\x8e\x01')
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            reader = helpers.Reader(m)
+            assert helpers.read_varints(reader) == 255
+            assert helpers.read_varints(reader) == 112233445566778899
+            del reader
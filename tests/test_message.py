@@ -0,0 +1,72 @@
+from bitcoin.ecc import PrivateKey
+from bitcoin.helpers import encode_base58_checksum, hash160
+from bitcoin.message import (
+    message_hash, recover_message_key, sign_message, verify_message,
+    verify_messages,
+)
+
+
+def test_message_hash():
+    # hash256 of the prefixed message, read as a big endian integer
+    assert message_hash('') == message_hash(b'')
+    assert message_hash('hello') != message_hash('hello!')
+
+
+def test_verify_core_vectors():
+    # from the Bitcoin Core signmessage tests
+    address = '15CRxFdyRpGZLW9w8HnHvVduizdL5jKNbs'
+    signature = ('IPojfrX2dfPnH26UegfbGQQLrdK844DlHq5157/P6h57WyuS/Qsl+h/WS'
+                 'VGDF4MUi4rWSswW38oimDYfNNUBUOk=')
+    assert verify_message(address, signature, 'Trust no one')
+    assert not verify_message(address, signature, 'Trust me')
+
+    address = 'mpLQjfK79b7CCV4VMJWEWAj5Mpx8Up5zxB'
+    signature = ('INbVnW4e6PeRmsv2Qgu8NuopvrVjkcxob+sX8OcZG0SALhWybUjzMLPd'
+                 'AsXI46YZGb0KQTRii+wWIQzRpG/U+S0=')
+    assert verify_message(address, signature, 'This is just a test message')
+
+
+def test_sign_and_verify():
+    private_key = PrivateKey(5002)
+    for compressed in (True, False):
+        address = private_key.point.address(compressed=compressed)
+        signature = sign_message(private_key, 'hello', compressed=compressed)
+
+        point, was_compressed = recover_message_key(signature, 'hello')
+
+        assert point == private_key.point
+        assert was_compressed == compressed
+        assert verify_message(address, signature, 'hello')
+        assert not verify_message(address, signature, 'hello!')
+
+
+def test_verify_bad_input():
+    private_key = PrivateKey(5002)
+    address = private_key.point.address()
+    signature = sign_message(private_key, 'hello')
+    other = PrivateKey(5003).point.address()
+
+    assert not verify_message(other, signature, 'hello')
+    assert not verify_message(address, 'not base64!', 'hello')
+    assert not verify_message(address, signature[:-4], 'hello')
+    assert not verify_message(address[:-1] + 'x', signature, 'hello')
+
+    # the same hash160 as a P2SH address
+    h160 = hash160(private_key.point.sec())
+    for version in (b'\x05', b'\xc4'):
+        p2sh = encode_base58_checksum(version + h160)
+        assert not verify_message(p2sh, signature, 'hello')
+
+
+def test_verify_messages():
+    items = []
+    for secret in range(1, 7):
+        private_key = PrivateKey(secret)
+        message = f'message {secret}'
+        items.append((private_key.point.address(),
+                      sign_message(private_key, message), message))
+    items[2] = (items[2][0], items[2][1], 'tampered')
+    expected = [True, True, False, True, True, True]
+
+    assert verify_messages(items, processes=0) == expected
+    assert verify_messages(items, processes=2, chunk_size=2) == expected
@@ -1065,3 +1065,11 @@ def test_op_checksig():
     stack = [sig, sec]
     op_checksig(stack=stack, z=z)
     assert stack == [encode_num(1)]
+
+
+def test_op_checksig_zero_s():
+    sec = bytes.fromhex('0279be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d9'
+                        '59f2815b16f81798')
+    stack = [bytes.fromhex('300602010102010001'), sec]
+    op_checksig(stack=stack, z=1)
+    assert stack == [encode_num(0)]
@@ -1,5 +1,8 @@
 from io import BytesIO
 
+import pytest
+
+from bitcoin.helpers import Reader
 from bitcoin.script import Script
 from bitcoin.op import *
 
@@ -67,3 +70,10 @@ def test_string_representation():
     ])
 
     assert str(script) == 'OP_5 OP_2 OP_ADD OP_7 OP_EQUAL'
+
+
+def test_parse_truncated():
+    with pytest.raises(SyntaxError):
+        Script.parse(Reader(bytes.fromhex('054c0a0102')))
+    with pytest.raises(SyntaxError):
+        Script.parse(BytesIO(bytes.fromhex('0a0102')))
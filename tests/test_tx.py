@@ -3,6 +3,7 @@ from io import BytesIO
 import pytest
 import responses
 
+from bitcoin.helpers import Reader
 from bitcoin.script import Script
 from bitcoin.tx import Tx, TxIn, TxOut
 
@@ -56,6 +57,12 @@ class TestTx:
         tx = Tx.parse(stream)
         assert tx.serialize() == raw_tx
 
+    def test_parse_reader(self, raw_tx):
+        reader = Reader(raw_tx + b'\x00')
+        tx = Tx.parse(reader)
+        assert tx.serialize() == raw_tx
+        assert len(reader) == 1
+
     @responses.activate
     def test_fee(self, stream, load_raw_tx):
         prev_tx_id = 'd1c789a9c60383bf715f3f6ad9d14b91fe55f3deb369fe5d9280cb1a01793f81'
@@ -0,0 +1,48 @@
+import pytest
+
+from bitcoin.ecc import PrivateKey
+from bitcoin.helpers import hash160
+from bitcoin.vanity import prefix_ranges, search
+
+
+def test_prefix_ranges():
+    for prefix, testnet in [('1A', False), ('1Bo', False), ('11', False),
+                            ('mz', True), ('n', True)]:
+        ranges = prefix_ranges(prefix, testnet)
+        for secret in range(1, 400):
+            point = PrivateKey(secret).point
+            address = point.address(testnet=testnet)
+            value = int.from_bytes(hash160(point.sec()), 'big')
+            if address.startswith(prefix):
+                assert any(lo <= value <= hi for lo, hi in ranges)
+
+
+def test_prefix_ranges_invalid():
+    with pytest.raises(ValueError):
+        prefix_ranges('1O')
+    with pytest.raises(ValueError):
+        prefix_ranges('A')
+    with pytest.raises(ValueError):
+        prefix_ranges('1A', testnet=True)
+    assert prefix_ranges('mA', testnet=True) == []
+    with pytest.raises(ValueError):
+        search('mA', testnet=True, processes=0)
+
+
+def test_search():
+    reports = []
+    results = search('1A', start=1000, processes=0, chunk_size=64,
+                     max_results=2, progress=lambda n, rate: reports.append(n))
+    assert len(results) == 2
+    for secret, address in results:
+        assert address.startswith('1A')
+        assert PrivateKey(secret).point.address() == address
+    assert reports and reports[-1] % 64 == 0
+
+
+def test_search_with_pool():
+    results = search('mz', compressed=False, testnet=True, start=5,
+                     processes=2, chunk_size=64)
+    secret, address = results[0]
+    assert address.startswith('mz')
+    assert PrivateKey(secret).point.address(False, True) == address